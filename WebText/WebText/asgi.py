@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WebText.settings')
 
-application = get_asgi_application()
+from core.static import ASGIStaticFilesHandler  # noqa: E402, needs the settings module
+
+# static files, and media files with CORE["SERVE_MEDIA"], are answered
+# before the middleware runs
+application = ASGIStaticFilesHandler(get_asgi_application())
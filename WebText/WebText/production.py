@@ -0,0 +1,29 @@
+"""
+Settings of the production profile, run the workers with
+`DJANGO_SETTINGS_MODULE=WebText.production`.
+
+The development apps and middleware of DEV_APPS / DEV_MIDDLEWARE are left
+out, so they are never imported. Run `python manage.py build_schema` on
+deploy to serve /doc.json and /doc.yaml without drf_yasg, and
+`python manage.py collectstatic` for the hashed and compressed static files.
+"""
+
+import os
+
+from WebText.settings import *  # noqa: F401,F403
+from WebText.settings import BASE_DIR, CORE, DEV_APPS, DEV_MIDDLEWARE, INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = False
+ALLOWED_HOSTS = [host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEV_APPS]
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in DEV_MIDDLEWARE]
+
+# `collectstatic` writes content-hashed names and their gzip variants,
+# core.static.StaticFilesHandler serves them, see wsgi.py
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "core.static.CompressedManifestStaticFilesStorage"},
+}
+
+CORE = dict(CORE, SCHEMA_DIR=BASE_DIR / "schema")
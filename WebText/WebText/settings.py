@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,18 @@ INSTALLED_APPS = [
     "debug_toolbar",
     "crispy_forms",
     "crispy_bootstrap5",
+    "core",
+]
+
+# development only, WebText/production.py leaves them out of the import graph,
+# /doc.json is still served from `manage.py build_schema` output without drf_yasg
+DEV_APPS = [
+    "django_extensions",
+    "drf_yasg",
+    "debug_toolbar",
+]
+DEV_MIDDLEWARE = [
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
@@ -57,6 +70,7 @@ INTERNAL_IPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middlewares.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -96,8 +110,18 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {},
     }
 }
+# SQLITE_TRANSACTION_MODE=IMMEDIATE takes the write lock at BEGIN, so
+# concurrent writers wait on busy_timeout instead of failing when they
+# upgrade a read lock. Every atomic() block then takes it, read-only ones
+# too, so it is left to deployments with several writing workers
+if os.environ.get("SQLITE_TRANSACTION_MODE"):
+    DATABASES["default"]["OPTIONS"]["transaction_mode"] = os.environ["SQLITE_TRANSACTION_MODE"]
+
+# reads of CoreViewSet go to CORE["READ_DATABASES"] when it is set
+DATABASE_ROUTERS = ["core.routers.ReadWriteRouter"]
 
 
 # Password validation
@@ -139,6 +163,10 @@ MEDIA_URL = "/media/"
 STATIC_ROOT = BASE_DIR / "static"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# uploads go to a temporary file in chunks and are hashed on the way,
+# see core/uploads.py
+FILE_UPLOAD_HANDLERS = ["core.uploads.HashingFileUploadHandler"]
+
 # TAGS
 from django.contrib.messages import constants as messages
 
@@ -183,9 +211,24 @@ SHELL_PLUS_IMPORTS = [
     "import os, json, sys",
 ]
 
+# the swagger / redoc pages load the cached schema instead of rebuilding it
+SWAGGER_SETTINGS = {
+    "SPEC_URL": ("schema-json", {"format": ".json"}),
+}
+REDOC_SETTINGS = {
+    "SPEC_URL": ("schema-json", {"format": ".json"}),
+}
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=240),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
+
+# sessions are read from the cache, the database is only hit on a miss
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# core app, only the keys that differ from core/conf.py DEFAULTS, e.g.
+# CORE = {"READ_DATABASES": ["replica"], "READ_STICKY_CACHE": "shared"}
+CORE = {}
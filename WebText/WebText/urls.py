@@ -20,35 +20,44 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path, re_path
 
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from core.api import InstrumentationReportView
+from core.schema import SchemaCache
 
-from rest_framework import permissions
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="CODERA API",
-        default_version="v1",
-    ),
+# rendered once per process, or read from `manage.py build_schema` output,
+# drf_yasg is only imported when the schema is rendered
+schema_cache = SchemaCache(
+    title="CODERA API",
+    default_version="v1",
     public=True,
-    permission_classes=(permissions.AllowAny,),
 )
 
 urlpatterns = [
     re_path(
         r"^doc(?P<format>\.json|\.yaml)$",
-        schema_view.without_ui(cache_timeout=0),
+        schema_cache.as_view(),
         name="schema-json",
     ),  # <-- Here
-    path(
-        "doc/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),  # <-- Here
-    path(
-        "redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"
-    ),  # <-- Here
     path("admin/", admin.site.urls),
-    path("__debug__/", include("debug_toolbar.urls")),
+    path(
+        "__instrumentation__/",
+        InstrumentationReportView.as_view(),
+        name="instrumentation-report",
+    ),
 ]
+# the swagger / redoc pages and the toolbar are left out of the production profile
+if "drf_yasg" in settings.INSTALLED_APPS:
+    urlpatterns += [
+        path(
+            "doc/",
+            schema_cache.as_ui_view("swagger"),
+            name="schema-swagger-ui",
+        ),  # <-- Here
+        path(
+            "redoc/", schema_cache.as_ui_view("redoc"), name="schema-redoc"
+        ),  # <-- Here
+    ]
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
+# core.static serves MEDIA_ROOT only with CORE["SERVE_MEDIA"], uploads are
+# still served in development, static() is empty unless DEBUG is on
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -13,4 +13,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WebText.settings')
 
-application = get_wsgi_application()
+from core.static import StaticFilesHandler  # noqa: E402, needs the settings module
+
+# static files, and media files with CORE["SERVE_MEDIA"], are answered
+# before the middleware runs
+application = StaticFilesHandler(get_wsgi_application())
@@ -0,0 +1,15 @@
+from core.api import CoreViewSet, ReadOnlyCoreViewSet
+from benchmarks.serializers import CampaignReadSerializer, CampaignSerializer, QuestSerializer
+
+
+class CampaignViewSet(CoreViewSet):
+    serializer_class = CampaignSerializer
+
+
+class CampaignReadViewSet(ReadOnlyCoreViewSet):
+    serializer_class = CampaignReadSerializer
+
+
+class QuestViewSet(CoreViewSet):
+    serializer_class = QuestSerializer
+    keyset_pagination = True
@@ -0,0 +1,14 @@
+from django import forms
+
+from core.forms import BasicForm
+from benchmarks.models import Campaign
+
+
+class CampaignForm(BasicForm):
+    name = forms.CharField()
+    description = forms.CharField(required=False)
+    level = forms.IntegerField()
+
+    class Meta:
+        verbose_name = "Campaign"
+        model = Campaign
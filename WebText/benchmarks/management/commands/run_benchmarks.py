@@ -0,0 +1,139 @@
+"""
+This file is used to define the run_benchmarks command
+
+HOW TO:
+1. Seed once: `python manage.py run_benchmarks --settings=benchmarks.settings --seed 1000000`
+2. Save a baseline: `... run_benchmarks --settings=benchmarks.settings --save baseline.json`
+3. After a change: `... run_benchmarks --settings=benchmarks.settings --compare baseline.json`
+
+This File Does:
+
+1. Migrates the benchmark database and seeds it with Faker data
+2. Runs every scenario of benchmarks/scenarios.py through the test client
+3. Prints throughput, p50/p99 latency, queries per request and peak memory
+4. Saves the results as JSON and compares them with a saved baseline
+
+"""
+
+import json
+import random
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from rest_framework.settings import api_settings
+
+from benchmarks.models import Campaign
+from benchmarks.runner import BenchContext, ScenarioFailed, compare, run_scenario
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.seeding import seed
+
+
+class Command(BaseCommand):
+    help = "Benchmark the CoreViewSet and BaseFormView / BaseListView code paths"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="campaigns to add first")
+        parser.add_argument("--quests", type=int, default=3, help="quests per seeded campaign")
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument(
+            "--only", action="append", default=[], help="scenario name prefix, repeatable"
+        )
+        parser.add_argument("--random-seed", type=int, default=0)
+        parser.add_argument("--save", help="write the results to this JSON file")
+        parser.add_argument("--compare", help="baseline JSON file to compare against")
+        parser.add_argument(
+            "--threshold", type=float, default=10.0, help="allowed slowdown in percent"
+        )
+
+    def handle(self, *args, **options):
+        call_command("migrate", verbosity=0)
+        if options["seed"]:
+            seed(
+                options["seed"],
+                quests_per_campaign=options["quests"],
+                random_seed=options["random_seed"],
+                stdout=self.stdout,
+            )
+
+        context = self.get_context(options)
+        scenarios = [
+            scenario
+            for scenario in SCENARIOS
+            if not options["only"] or scenario.name.startswith(tuple(options["only"]))
+        ]
+
+        self.stdout.write(
+            f"{context.campaign_count} campaigns on {connection.vendor}, "
+            f"{options['iterations']} requests per scenario"
+        )
+        self.stdout.write(
+            f"{'scenario':<20}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>10}{'peak kB':>10}"
+        )
+        results = {}
+        for scenario in scenarios:
+            try:
+                result = run_scenario(
+                    scenario, context, options["iterations"], warmup=options["warmup"]
+                )
+            except ScenarioFailed as exc:
+                raise CommandError(str(exc))
+            results[scenario.name] = result
+            self.stdout.write(
+                f"{scenario.name:<20}{result['throughput']:>10}{result['p50_ms']:>10}"
+                f"{result['p99_ms']:>10}{result['queries']:>10}{result['peak_kb']:>10}"
+            )
+
+        report = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(),
+                "vendor": connection.vendor,
+                "campaigns": context.campaign_count,
+                "iterations": options["iterations"],
+            },
+            "results": results,
+        }
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"saved {options['save']}")
+        if options["compare"]:
+            self.compare(options["compare"], results, options["threshold"])
+
+    def get_context(self, options):
+        stats = Campaign.objects.aggregate(max_id=Max("id"))
+        if stats["max_id"] is None:
+            raise CommandError("The benchmark database is empty, run with --seed N first.")
+        user, created = User.objects.get_or_create(
+            username="benchmark", defaults={"is_staff": True, "is_superuser": True}
+        )
+        client = Client()
+        client.force_login(user)
+        return BenchContext(
+            client,
+            random.Random(options["random_seed"]),
+            max_campaign_id=stats["max_id"],
+            campaign_count=Campaign.objects.count(),
+            page_size=api_settings.PAGE_SIZE,
+        )
+
+    def compare(self, path, results, threshold):
+        with open(path) as file:
+            baseline = json.load(file)["results"]
+        self.stdout.write(f"compared with {path}")
+        regressions = []
+        for name, metric, old, new, change, regressed in compare(baseline, results, threshold):
+            line = f"{name:<20}{metric:<12}{old:>10} -> {new:<10}{change:+.1f}%"
+            if regressed:
+                regressions.append(line)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {path}")
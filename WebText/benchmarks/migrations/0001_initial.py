@@ -0,0 +1,47 @@
+# Generated by Django 5.1 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Campaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, default='')),
+                ('level', models.IntegerField(default=1)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'abstract': False,
+                'indexes': [models.Index(fields=['created_at', 'id'], name='benchmarks__created_b5abed_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Quest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255)),
+                ('text', models.TextField(blank=True, default='')),
+                ('reward', models.IntegerField(default=0)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quests', to='benchmarks.campaign')),
+            ],
+            options={
+                'abstract': False,
+                'indexes': [models.Index(fields=['created_at', 'id'], name='benchmarks__created_c872e1_idx')],
+            },
+        ),
+    ]
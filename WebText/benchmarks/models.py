@@ -0,0 +1,25 @@
+"""
+This file is used to define the models the benchmarks run against
+
+This File Does:
+
+1. Defines the Campaign model
+2. Defines the Quest model
+
+"""
+
+from django.db import models
+
+from core.models import BaseModel
+
+
+class Campaign(BaseModel):
+    description = models.TextField(blank=True, default="")
+    level = models.IntegerField(default=1)
+    is_active = models.BooleanField(default=True)
+
+
+class Quest(BaseModel):
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name="quests")
+    text = models.TextField(blank=True, default="")
+    reward = models.IntegerField(default=0)
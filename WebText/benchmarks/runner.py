@@ -0,0 +1,118 @@
+"""
+This file is used to define how the benchmark scenarios are measured
+
+This File Does:
+
+1. Defines the Scenario namedtuple and the BenchContext class
+2. Defines the run_scenario function
+3. Defines the compare function used against saved baselines
+
+"""
+
+import time
+import tracemalloc
+from collections import namedtuple
+
+from core.instrumentation import Histogram, QueryCollector
+
+
+# name: "group.action", request: function(BenchContext) -> response
+Scenario = namedtuple("Scenario", ["name", "request"])
+
+# metric -> True when a higher value is better
+METRICS = {
+    "throughput": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "queries": False,
+    "peak_kb": False,
+}
+
+
+class BenchContext:
+    """What the scenarios share: the test client, a seeded random
+    generator and the id range of the seeded rows."""
+
+    def __init__(self, client, rng, max_campaign_id, campaign_count, page_size):
+        self.client = client
+        self.rng = rng
+        self.max_campaign_id = max_campaign_id
+        self.campaign_count = campaign_count
+        self.page_size = page_size
+
+    def campaign_id(self):
+        return self.rng.randint(1, self.max_campaign_id)
+
+    def page(self):
+        return self.rng.randint(1, max(1, self.campaign_count // self.page_size))
+
+
+class ScenarioFailed(Exception):
+    pass
+
+
+def call(scenario, context):
+    response = scenario.request(context)
+    if response.status_code >= 400:
+        raise ScenarioFailed(
+            f"{scenario.name} answered {response.status_code}: {response.content[:200]!r}"
+        )
+    return response
+
+
+def run_scenario(scenario, context, iterations, warmup=10, memory_iterations=20):
+    """Time `iterations` requests of `scenario` after `warmup` ones.
+    Peak memory is measured in a separate, shorter pass because
+    tracemalloc slows everything down."""
+    for _ in range(warmup):
+        call(scenario, context)
+
+    latencies = Histogram(window=iterations)
+    collector = QueryCollector()
+    start = time.perf_counter()
+    with collector.installed():
+        for _ in range(iterations):
+            request_start = time.perf_counter()
+            call(scenario, context)
+            latencies.add((time.perf_counter() - request_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        for _ in range(memory_iterations):
+            call(scenario, context)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    summary = latencies.summary()
+    return {
+        "requests": iterations,
+        "throughput": round(iterations / elapsed, 1),
+        "p50_ms": round(summary["p50"], 2),
+        "p99_ms": round(summary["p99"], 2),
+        "queries": round(collector.count / iterations, 2),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(baseline, current, threshold):
+    """Yield `(scenario, metric, old, new, change in %, regressed)` for
+    every metric present in both runs. Timings and memory regress when
+    they get more than `threshold` percent worse, query counts on any
+    increase."""
+    for name, results in current.items():
+        old_results = baseline.get(name)
+        if old_results is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = old_results.get(metric), results.get(metric)
+            if old is None or new is None:
+                continue
+            change = 0.0 if old == 0 else (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            if metric == "queries":
+                regressed = new > old
+            else:
+                regressed = worse > threshold
+            yield name, metric, old, new, change, regressed
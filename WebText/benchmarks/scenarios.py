@@ -0,0 +1,88 @@
+"""
+This file is used to define the benchmark scenarios
+
+HOW TO:
+1. Write a function taking a BenchContext and returning the response
+2. Add it to SCENARIOS with a "group.action" name
+
+This File Does:
+
+1. Defines the CoreViewSet scenarios (list, retrieve, create, update, bulk)
+2. Defines the BaseListView / BaseFormView scenarios
+3. Defines the SCENARIOS list
+
+"""
+
+from benchmarks.runner import Scenario
+
+API = "/bench/api"
+
+
+def api_list(context):
+    return context.client.get(f"{API}/campaigns/", {"page": context.page()})
+
+
+def api_keyset_list(context):
+    return context.client.get(f"{API}/quests/")
+
+
+def api_read_list(context):
+    return context.client.get(f"{API}/read-campaigns/", {"page": context.page()})
+
+
+def api_retrieve(context):
+    return context.client.get(f"{API}/campaigns/{context.campaign_id()}/")
+
+
+def api_create(context):
+    data = {"name": "bench campaign", "level": context.rng.randint(1, 100)}
+    return context.client.post(f"{API}/campaigns/", data, content_type="application/json")
+
+
+def api_update(context):
+    data = {"level": context.rng.randint(1, 100)}
+    return context.client.patch(
+        f"{API}/campaigns/{context.campaign_id()}/", data, content_type="application/json"
+    )
+
+
+def api_bulk_create(context):
+    data = [{"name": f"bulk campaign {i}", "level": i % 100} for i in range(50)]
+    return context.client.post(f"{API}/campaigns/bulk/", data, content_type="application/json")
+
+
+def api_bulk_update(context):
+    data = [
+        {"id": context.campaign_id(), "level": context.rng.randint(1, 100)} for _ in range(50)
+    ]
+    return context.client.patch(
+        f"{API}/campaigns/bulk/", data, content_type="application/json"
+    )
+
+
+def views_list(context):
+    return context.client.get("/bench/campaigns/", {"page": context.page()})
+
+
+def views_form_get(context):
+    return context.client.get(f"/bench/campaigns/{context.campaign_id()}/")
+
+
+def views_form_post(context):
+    data = {"name": "bench campaign", "description": "", "level": context.rng.randint(1, 100)}
+    return context.client.post(f"/bench/campaigns/{context.campaign_id()}/", data)
+
+
+SCENARIOS = [
+    Scenario("api.list", api_list),
+    Scenario("api.keyset_list", api_keyset_list),
+    Scenario("api.read_list", api_read_list),
+    Scenario("api.retrieve", api_retrieve),
+    Scenario("api.create", api_create),
+    Scenario("api.update", api_update),
+    Scenario("api.bulk_create", api_bulk_create),
+    Scenario("api.bulk_update", api_bulk_update),
+    Scenario("views.list", views_list),
+    Scenario("views.form_get", views_form_get),
+    Scenario("views.form_post", views_form_post),
+]
@@ -0,0 +1,56 @@
+"""
+This file is used to define the data seeding of the benchmarks
+
+This File Does:
+
+1. Defines the seed function, filling Campaign and Quest with Faker data
+
+"""
+
+import random
+
+from django.db import transaction
+from faker import Faker
+
+from core.utils import chunked
+from benchmarks.models import Campaign, Quest
+
+
+def seed(campaigns, quests_per_campaign=3, batch_size=5000, random_seed=0, stdout=None):
+    """Insert `campaigns` Campaign rows and `quests_per_campaign` Quest
+    rows for each of them, in batches of `batch_size`."""
+    fake = Faker()
+    Faker.seed(random_seed)
+    generator = random.Random(random_seed)
+    # Faker is slow per value, so rows are assembled from pools
+    names = [fake.catch_phrase() for _ in range(1000)]
+    texts = [fake.paragraph(nb_sentences=3) for _ in range(1000)]
+
+    def campaign_rows():
+        for _ in range(campaigns):
+            yield Campaign(
+                name=generator.choice(names),
+                description=generator.choice(texts),
+                level=generator.randint(1, 100),
+                is_active=generator.random() < 0.9,
+            )
+
+    created = 0
+    for batch in chunked(campaign_rows(), batch_size):
+        with transaction.atomic():
+            batch = Campaign.objects.bulk_create(batch)
+            quests = [
+                Quest(
+                    campaign=campaign,
+                    name=generator.choice(names),
+                    text=generator.choice(texts),
+                    reward=generator.randint(0, 1000),
+                )
+                for campaign in batch
+                for _ in range(quests_per_campaign)
+            ]
+            Quest.objects.bulk_create(quests, batch_size=batch_size)
+        created += len(batch)
+        if stdout is not None:
+            stdout.write(f"seeded {created}/{campaigns} campaigns")
+    return created
@@ -0,0 +1,37 @@
+from rest_framework import serializers
+
+from core.serializers import CoreReadOnlySerializer, CoreSerializer
+from benchmarks.models import Campaign, Quest
+
+
+class CampaignSerializer(CoreSerializer):
+    name = serializers.CharField()
+    description = serializers.CharField(required=False, allow_blank=True)
+    level = serializers.IntegerField(required=False)
+    is_active = serializers.BooleanField(required=False)
+
+    class Meta:
+        model = Campaign
+        fields = ["id", "name", "description", "level", "is_active"]
+        updateable_fields = ["name", "description", "level", "is_active"]
+
+
+class CampaignReadSerializer(CoreReadOnlySerializer):
+    name = serializers.CharField()
+    level = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+
+    class Meta:
+        model = Campaign
+        fields = ["id", "name", "level", "created_at"]
+
+
+class QuestSerializer(CoreSerializer):
+    name = serializers.CharField()
+    reward = serializers.IntegerField(required=False)
+    campaign = serializers.PrimaryKeyRelatedField(queryset=Campaign.objects.all())
+
+    class Meta:
+        model = Quest
+        fields = ["id", "name", "reward", "campaign"]
+        updateable_fields = ["name", "reward"]
@@ -0,0 +1,29 @@
+"""
+Settings of the benchmark suite, run it with
+`python manage.py run_benchmarks --settings=benchmarks.settings`.
+"""
+
+from WebText.settings import *  # noqa: F401,F403
+from WebText.settings import BASE_DIR, CORE, INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = False
+ALLOWED_HOSTS = ["testserver"]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != "debug_toolbar"] + ["benchmarks"]
+MIDDLEWARE = [
+    middleware
+    for middleware in MIDDLEWARE
+    if middleware != "debug_toolbar.middleware.DebugToolbarMiddleware"
+]
+ROOT_URLCONF = "benchmarks.urls"
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "benchmarks.sqlite3",
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+    }
+}
+
+# measure the views, not the per-request instrumentation
+CORE = dict(CORE, INSTRUMENTATION=False)
@@ -0,0 +1,82 @@
+"""
+This file is used to define the tests for the benchmarks app
+
+This File Does:
+
+1. Tests how run_scenario measures a scenario
+2. Tests how compare flags regressions against a baseline
+
+"""
+
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from benchmarks.runner import (
+    BenchContext,
+    Scenario,
+    ScenarioFailed,
+    compare,
+    run_scenario,
+)
+
+
+def respond(status_code):
+    return lambda context: mock.Mock(status_code=status_code, content=b"")
+
+
+class RunScenarioTestCase(SimpleTestCase):
+    def get_context(self):
+        return BenchContext(None, random.Random(1), 100, 100, 10)
+
+    def test_results_hold_every_metric(self):
+        results = run_scenario(
+            Scenario("api.list", respond(200)),
+            self.get_context(),
+            20,
+            warmup=1,
+            memory_iterations=2,
+        )
+        self.assertEqual(
+            set(results), {"requests", "throughput", "p50_ms", "p99_ms", "queries", "peak_kb"}
+        )
+        self.assertEqual(results["requests"], 20)
+        self.assertEqual(results["queries"], 0)
+
+    def test_error_responses_fail_the_scenario(self):
+        with self.assertRaises(ScenarioFailed):
+            run_scenario(Scenario("api.list", respond(500)), self.get_context(), 5)
+
+    def test_context_stays_in_the_seeded_range(self):
+        context = self.get_context()
+        for _ in range(50):
+            self.assertTrue(1 <= context.campaign_id() <= 100)
+            self.assertTrue(1 <= context.page() <= 10)
+
+
+class CompareTestCase(SimpleTestCase):
+    baseline = {"api.list": {"throughput": 100.0, "p50_ms": 10.0, "queries": 2}}
+
+    def get_regressions(self, current, threshold=10):
+        return {
+            metric: regressed
+            for _, metric, _, _, _, regressed in compare(self.baseline, current, threshold)
+        }
+
+    def test_changes_within_the_threshold_pass(self):
+        current = {"api.list": {"throughput": 95.0, "p50_ms": 10.5, "queries": 2}}
+        self.assertEqual(
+            self.get_regressions(current),
+            {"throughput": False, "p50_ms": False, "queries": False},
+        )
+
+    def test_slower_and_chattier_runs_regress(self):
+        current = {"api.list": {"throughput": 80.0, "p50_ms": 12.0, "queries": 3}}
+        self.assertEqual(
+            self.get_regressions(current),
+            {"throughput": True, "p50_ms": True, "queries": True},
+        )
+
+    def test_scenarios_missing_from_the_baseline_are_skipped(self):
+        self.assertEqual(list(compare(self.baseline, {"api.create": {"queries": 9}}, 10)), [])
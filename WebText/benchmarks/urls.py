@@ -0,0 +1,17 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from benchmarks.api import CampaignReadViewSet, CampaignViewSet, QuestViewSet
+from benchmarks.views import CampaignFormView, CampaignListView
+
+router = DefaultRouter()
+router.register("campaigns", CampaignViewSet, basename="bench-campaigns")
+router.register("read-campaigns", CampaignReadViewSet, basename="bench-read-campaigns")
+router.register("quests", QuestViewSet, basename="bench-quests")
+
+urlpatterns = [
+    path("bench/api/", include(router.urls)),
+    path("bench/campaigns/", CampaignListView.as_view(), name="bench-campaign-list"),
+    path("bench/campaigns/new/", CampaignFormView.as_view(), name="bench-campaign-create"),
+    path("bench/campaigns/<int:pk>/", CampaignFormView.as_view(), name="bench-campaign-update"),
+]
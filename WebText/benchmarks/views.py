@@ -0,0 +1,16 @@
+from core.views import BaseFormView, BaseListView
+from benchmarks.forms import CampaignForm
+from benchmarks.models import Campaign
+
+
+class CampaignFormView(BaseFormView):
+    form_class = CampaignForm
+    template_name = "benchmarks/form.html"
+    success_url = "/bench/campaigns/"
+
+
+class CampaignListView(BaseListView):
+    model = Campaign
+    template_name = "benchmarks/list.html"
+    row_template_name = "benchmarks/row.html"
+    ordering = ["-id"]
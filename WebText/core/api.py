@@ -8,6 +8,18 @@ This File Does:
 3. Defines the get_queryset method
 4. Defines the perform_create method
 5. Defines the paginate_this_response method
+6. Caches the users resolved by get_user, per token
+7. Registers the user models get_user can resolve
+8. Reads the bearer token from the request's TokenContext
+9. Switches to KeysetPagination when keyset_pagination is set
+10. Defines the bulk create / update / delete action
+11. Serves ReadOnlyCoreViewSet.list from compiled values() rows
+12. Answers ReadOnlyCoreViewSet GETs with ETag / 304 and a response cache, both
+    opt-in and only for views that render no related rows
+13. Defines the InstrumentationReportView class
+14. Plans select_related / prefetch_related / only() for get_queryset
+15. Defines the AsyncCoreViewSet and AsyncReadOnlyCoreViewSet classes
+16. Sends read-only requests to the read replicas through core.routers
 
 """
 
@@ -15,7 +27,8 @@ This File Does:
 from rest_framework import status, viewsets, exceptions, serializers  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework.decorators import action  # type: ignore
-from rest_framework.permissions import AllowAny  # type: ignore
+from rest_framework.permissions import AllowAny, IsAdminUser  # type: ignore
+from rest_framework.views import APIView  # type: ignore
 
 from rest_framework_simplejwt.views import TokenObtainPairView  # type: ignore
 from rest_framework_simplejwt.authentication import JWTAuthentication, api_settings
@@ -24,18 +37,83 @@ from rest_framework_simplejwt.exceptions import (  # type: ignore
     InvalidToken,  # type: ignore
     TokenError,  # type: ignore
 )
-import jwt
+import copy
+import functools
+import hashlib
+import time
 
-from django.apps import apps
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.contrib.auth.models import AbstractBaseUser
 from django.db.models.query import QuerySet
-from django.db.models import Q
+from django.db.models import Count, Max, Q
 from django.core import exceptions
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
 
+from core.cache import LRUCache, ResponseCache
+from core.conf import core_setting
+from core.instrumentation import recorder
+from core.pagination import KeysetPagination
+from core.queries import apply_query_plan, build_query_plan
+from core.registry import UserRegistry
+from core.routers import SAFE_METHODS, route_request
+from core.tokens import get_token_context
+from core.utils import chunked
 
-studentuser_model = apps.get_model("codera_schools", "StudentUser")
-adminuser_model = apps.get_model("codera_schools", "AdminUser")
-teacheruser_model = apps.get_model("codera_schools", "TeacherUser")
+
+# user_type claim -> user model, full rows so views can read any field
+# of the cached user without a query per deferred field
+user_registry = UserRegistry()
+user_registry.register("admin", "codera_schools.AdminUser")
+user_registry.register("teacher", "codera_schools.TeacherUser")
+user_registry.register("student", "codera_schools.StudentUser")
+
+_legacy_user_models = {
+    "adminuser_model": "admin",
+    "teacheruser_model": "teacher",
+    "studentuser_model": "student",
+}
+
+# (user_type, user_id) -> user, shared by every CoreViewSet in the process
+user_cache = LRUCache(maxsize=core_setting("USER_CACHE_SIZE"))
+
+
+def __getattr__(name):
+    """Keep `adminuser_model` & co. importable without resolving them at
+    import time."""
+    if name in _legacy_user_models:
+        return user_registry.get_lookup(_legacy_user_models[name]).model
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_user_cache_key(user_type, user_id):
+    return (user_type, str(user_id))
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached user whenever its row is saved or deleted,
+    so changes such as `is_onboarded` are seen by the next request."""
+    user_type = user_registry.get_user_type(sender)
+    if user_type is not None:
+        user_cache.delete(get_user_cache_key(user_type, instance.pk))
+
+
+user_registry.connect(invalidate_cached_user)
+
+
+# rendered ReadOnlyCoreViewSet payloads, see ReadOnlyCoreViewSet.cache_responses
+response_cache = ResponseCache(maxsize=core_setting("RESPONSE_CACHE_SIZE"))
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    response_cache.invalidate(sender._meta.label)
+
+
+post_save.connect(invalidate_cached_responses)
+post_delete.connect(invalidate_cached_responses)
 
 
 class CoreViewSet(viewsets.ModelViewSet):
@@ -43,6 +121,20 @@ class CoreViewSet(viewsets.ModelViewSet):
     queryset = None
     permission_classes = (AllowAny,)
     model = None
+    user_registry = user_registry
+    # recorded by core.middlewares.InstrumentationMiddleware
+    instrumented = True
+    # opt in to cursor pages over (created_at, id) instead of PAGE_SIZE pages
+    keyset_pagination = False
+    keyset_pagination_class = KeysetPagination
+    # rows per INSERT/UPDATE/DELETE batch of the bulk action
+    bulk_batch_size = None
+    # query hints for get_queryset, None derives them from serializer_class
+    select_related_fields = None
+    prefetch_related_fields = None
+    only_fields = None
+    # let safe requests read from CORE["READ_DATABASES"], see core/routers.py
+    read_from_replicas = True
 
     @classmethod
     def get_serializer_class(
@@ -56,40 +148,232 @@ class CoreViewSet(viewsets.ModelViewSet):
             return cls.model
         return cls.get_serializer_class().get_model()  # type: ignore
 
-    def get_user(self, decoded):
-        user_id = decoded.get("user_id", None)
-        user_type = decoded.get("user_type", None)
-        user: AbstractBaseUser
-        if user_type == "admin":
-            user = adminuser_model.objects.get(id=user_id)
-        if user_type == "teacher":
-            user = teacheruser_model.objects.get(id=user_id)
-        if user_type == "student":
-            user = studentuser_model.objects.get(id=user_id)
+    def get_user_cache_timeout(self, decoded):
+        """Seconds the user resolved for `decoded` may stay cached,
+        never longer than the token itself is valid."""
+        timeout = core_setting("USER_CACHE_TTL")
+        expires_at = decoded.get("exp", None)
+        if expires_at is not None:
+            timeout = min(timeout, expires_at - time.time())
+        return timeout
+
+    def get_decoded_cache_key(self, decoded):
+        return get_user_cache_key(decoded.get("user_type", None), decoded.get("user_id", None))
+
+    def get_cached_user(self, decoded):
+        user = user_cache.get(self.get_decoded_cache_key(decoded))
+        # every request gets its own copy, changes to it stay in that request
+        return copy.deepcopy(user) if user is not None else None
+
+    def cache_user(self, decoded, user):
+        timeout = self.get_user_cache_timeout(decoded)
+        if timeout > 0:
+            user_cache.set(self.get_decoded_cache_key(decoded), copy.deepcopy(user), timeout)
+
+    def check_user(self, user):
         if user.is_onboarded:
             return user
         else:
             raise exceptions.PermissionDenied("You are on waitlist", "access_denied")
 
+    def get_user(self, decoded):
+        user: AbstractBaseUser = self.get_cached_user(decoded)
+        if user is None:
+            user = self.user_registry.get(
+                decoded.get("user_type", None), decoded.get("user_id", None)
+            )
+            self.cache_user(decoded, user)
+        return self.check_user(user)
+
+    async def aget_user(self, decoded):
+        """Async version of get_user."""
+        user: AbstractBaseUser = self.get_cached_user(decoded)
+        if user is None:
+            user = await self.user_registry.aget(
+                decoded.get("user_type", None), decoded.get("user_id", None)
+            )
+            self.cache_user(decoded, user)
+        return self.check_user(user)
+
+    def is_read_only_request(self, request):
+        """True when `request` may be served from a read replica."""
+        return self.read_from_replicas and request.method in SAFE_METHODS
+
+    def dispatch(self, request, *args, **kwargs):
+        with route_request(request, self.is_read_only_request(request)):
+            return super().dispatch(request, *args, **kwargs)
+
     def get_decoded_token(self, request):
-        if "HTTP_AUTHORIZATION" in request.META.keys():
+        context = get_token_context(request)
+        if context.raw_token:
             try:
-                raw_token = request.META["HTTP_AUTHORIZATION"].split()[-1]
-                _decoded = jwt.decode(
-                    raw_token,
-                    options={"verify_signature": False},
-                )
-                return self.get_user(_decoded), _decoded
+                if not context.is_valid:
+                    raise AuthenticationFailed(context.errors)
+                return self.get_user(context.payload), context.payload
+            except Exception as E:
+                raise AuthenticationFailed("User Not Authenticated for This Action")
+        return None, None
+
+    async def aget_decoded_token(self, request):
+        """Async version of get_decoded_token."""
+        context = get_token_context(request)
+        if context.raw_token:
+            try:
+                if not context.is_valid:
+                    raise AuthenticationFailed(context.errors)
+                return await self.aget_user(context.payload), context.payload
             except Exception as E:
                 raise AuthenticationFailed("User Not Authenticated for This Action")
         return None, None
 
+    @property
+    def paginator(self):
+        if self.keyset_pagination and not hasattr(self, "_paginator"):
+            self._paginator = self.keyset_pagination_class()
+        return super().paginator
+
+    @classmethod
+    def get_required_columns(cls):
+        """Columns the view itself reads, kept by only() whatever the
+        serializer renders."""
+        if cls.keyset_pagination:
+            return tuple(cls.keyset_pagination_class.position_fields)
+        return ()
+
+    @classmethod
+    def get_hinted_query_plan(cls):
+        """The QueryPlan of serializer_class, overridden by any hint the
+        class sets, before get_required_columns is added."""
+        if "_hinted_query_plan" not in cls.__dict__:
+            plan = build_query_plan(cls.get_serializer_class(), cls.get_model())
+            cls._hinted_query_plan = plan._replace(
+                **{
+                    key: tuple(hint)
+                    for key, hint in (
+                        ("select_related", cls.select_related_fields),
+                        ("prefetch_related", cls.prefetch_related_fields),
+                        ("only", cls.only_fields),
+                    )
+                    if hint is not None
+                }
+            )
+        return cls._hinted_query_plan
+
+    @classmethod
+    def get_query_plan(cls):
+        """The QueryPlan of this class, built from serializer_class on
+        first use and overridden by any hint the class sets."""
+        if "_query_plan" not in cls.__dict__:
+            plan = cls.get_hinted_query_plan()
+            if plan.only:
+                plan = plan._replace(
+                    only=tuple(dict.fromkeys(plan.only + cls.get_required_columns()))
+                )
+            cls._query_plan = plan
+        return cls._query_plan
+
     def get_queryset(self):
-        return self.get_model().objects.all()
+        return apply_query_plan(self.get_model().objects.all(), self.get_query_plan())
 
     def perform_create(self, serializer):
         return serializer.create(serializer.validated_data)
 
+    def get_bulk_batch_size(self):
+        return self.bulk_batch_size or core_setting("BULK_BATCH_SIZE")
+
+    def get_bulk_serializer(self, items, partial=False):
+        serializer = self.get_serializer_class()(
+            data=items, many=True, partial=partial, context=self.get_serializer_context()
+        )
+        if not isinstance(items, list):
+            serializer.is_valid(raise_exception=True)
+        return serializer
+
+    def get_bulk_response(self, ids, errors, success_status):
+        data = {"count": len(ids), "ids": ids, "errors": errors}
+        if errors and not ids:
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=success_status)
+
+    @action(detail=False, methods=["post", "put", "patch", "delete"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        """Create (POST), update (PUT/PATCH) or delete (DELETE) a list of
+        objects. Every item is validated and reported on its own."""
+        if request.method == "DELETE":
+            return self.perform_bulk_destroy(request.data)
+        if request.method == "POST":
+            return self.perform_bulk_create(request.data)
+        return self.perform_bulk_update(request.data, partial=request.method == "PATCH")
+
+    def perform_bulk_create(self, items):
+        serializer = self.get_bulk_serializer(items)
+        valid, errors = serializer.validate_items(items)
+        created, write_errors = serializer.bulk_create(valid, self.get_bulk_batch_size())
+        errors = sorted(errors + write_errors, key=lambda error: error["index"])
+        return self.get_bulk_response(
+            [obj.pk for obj in created], errors, status.HTTP_201_CREATED
+        )
+
+    def get_bulk_pks(self, items, pk_field):
+        """Convert `(index, item)` pairs, an item being a primary key or an
+        object with an `id`, with `pk_field.to_python`. Returns `(valid,
+        errors)`, `valid` holding `(index, pk)` pairs."""
+        valid, errors = [], []
+        for index, item in items:
+            pk = item.get("id", None) if isinstance(item, dict) else item
+            try:
+                pk = pk_field.to_python(pk)
+            except exceptions.ValidationError as exc:
+                errors.append({"index": index, "errors": {"id": exc.messages}})
+                continue
+            except (TypeError, ValueError):
+                errors.append({"index": index, "errors": {"id": ["Invalid id."]}})
+                continue
+            if pk is None:
+                errors.append({"index": index, "errors": {"id": ["This field is required."]}})
+            else:
+                valid.append((index, pk))
+        return valid, errors
+
+    def perform_bulk_update(self, items, partial=False):
+        serializer = self.get_bulk_serializer(items, partial=partial)
+        valid, errors = serializer.validate_items(items)
+        queryset = self.get_queryset()
+        pks, pk_errors = self.get_bulk_pks(
+            [(index, items[index]) for index, _ in valid], queryset.model._meta.pk
+        )
+        data = dict(valid)
+        triples = [(index, pk, data[index]) for index, pk in pks]
+        updated, write_errors = serializer.bulk_update(
+            triples, self.get_bulk_batch_size(), queryset
+        )
+        errors = sorted(errors + pk_errors + write_errors, key=lambda error: error["index"])
+        return self.get_bulk_response(
+            [obj.pk for obj in updated], errors, status.HTTP_200_OK
+        )
+
+    def perform_bulk_destroy(self, ids):
+        """`ids` is a list of primary keys, or of objects with an `id`."""
+        if not isinstance(ids, list):
+            raise serializers.ValidationError("Expected a list of ids.")
+        queryset = self.get_queryset()
+        valid, errors = self.get_bulk_pks(enumerate(ids), queryset.model._meta.pk)
+
+        deleted = []
+        for batch in chunked(valid, self.get_bulk_batch_size()):
+            with transaction.atomic():
+                found = set(
+                    queryset.filter(pk__in=[pk for _, pk in batch]).values_list("pk", flat=True)
+                )
+                queryset.filter(pk__in=found).delete()
+            for index, pk in batch:
+                if pk in found:
+                    deleted.append(pk)
+                else:
+                    errors.append({"index": index, "errors": ["Not found."]})
+        errors = sorted(errors, key=lambda error: error["index"])
+        return self.get_bulk_response(deleted, errors, status.HTTP_200_OK)
+
     def paginate_this_response(
         self,
         queryset: QuerySet,
@@ -106,6 +390,141 @@ class CoreViewSet(viewsets.ModelViewSet):
 
 
 class ReadOnlyCoreViewSet(CoreViewSet):
+    # serve list() from values() rows when the serializer can be compiled
+    compiled_list = True
+    # opt in to answering GETs with 304 when the client's ETag is still
+    # current. The ETag only follows id / updated_at of the view's model, so
+    # leave it off when the serializer reads related rows some other way
+    # than the select_related / prefetch_related of get_query_plan
+    conditional_get = False
+    # keep rendered payloads in response_cache, keyed like the ETag
+    cache_responses = False
+    response_cache_timeout = None
+
+    def is_read_only_request(self, request):
+        return self.read_from_replicas
+
+    @classmethod
+    def supports_conditional_get(cls):
+        if not (cls.conditional_get or cls.cache_responses):
+            return False
+        plan = cls.get_hinted_query_plan()
+        # related rows change without moving updated_at of this model
+        if plan.select_related or plan.prefetch_related:
+            return False
+        return any(
+            field.name == "updated_at" for field in cls.get_model()._meta.concrete_fields
+        )
+
+    @classmethod
+    def get_required_columns(cls):
+        columns = super().get_required_columns()
+        if cls.supports_conditional_get():
+            columns += ("updated_at",)
+        return columns
+
+    def get_etag(self, request, state):
+        """The ETag of `state` as seen by this caller and query string."""
+        caller = (request.get_full_path(), request.META.get("HTTP_AUTHORIZATION", ""))
+        key = repr((self.get_model()._meta.label, state, caller))
+        return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+    def get_not_modified_response(self, request, etag, timestamp):
+        """A 304 when the client already holds `etag`, otherwise None."""
+        if not self.conditional_get:
+            return None
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+        return not_modified
+
+    def get_cached_data(self, etag):
+        if not self.cache_responses:
+            return None
+        return response_cache.get(self.get_model()._meta.label, etag)
+
+    def set_cached_data(self, etag, data):
+        if self.cache_responses:
+            timeout = self.response_cache_timeout or core_setting("RESPONSE_CACHE_TTL")
+            response_cache.set(self.get_model()._meta.label, etag, data, timeout)
+
+    def get_etag_response(self, data, etag, timestamp):
+        response = Response(data)
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def get_conditional_response(self, request, state, render, last_modified=None):
+        """Return a 304 when the client already holds `state`, otherwise
+        the payload of `render()`, served from response_cache when
+        cache_responses is set."""
+        etag = self.get_etag(request, state)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = self.get_not_modified_response(request, etag, timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        data = self.get_cached_data(etag)
+        if data is None:
+            data = render().data
+            self.set_cached_data(etag, data)
+        return self.get_etag_response(data, etag, timestamp)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.supports_conditional_get():
+            return super().retrieve(request, *args, **kwargs)
+        instance = self.get_object()
+        return self.get_conditional_response(
+            request,
+            (instance.pk, instance.updated_at),
+            lambda: Response(self.get_serializer(instance).data),
+            last_modified=instance.updated_at,
+        )
+
+    def get_compiled_representation(self):
+        serializer_class = self.get_serializer_class()
+        if not self.compiled_list or not hasattr(
+            serializer_class, "get_compiled_representation"
+        ):
+            return None
+        return serializer_class.get_compiled_representation()
+
+    def list(self, request, *args, **kwargs):
+        if not self.supports_conditional_get():
+            return self.render_list(request, *args, **kwargs)
+        state = self.filter_queryset(self.get_queryset()).aggregate(
+            last_modified=Max("updated_at"), count=Count("pk")
+        )
+        # no Last-Modified here: a delete lowers the count without moving
+        # MAX(updated_at), so only the ETag tells the two apart
+        return self.get_conditional_response(
+            request,
+            (state["last_modified"], state["count"]),
+            lambda: self.render_list(request, *args, **kwargs),
+        )
+
+    def render_list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_representation()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.get_compiled_rows(compiled)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([compiled.represent(row) for row in page])
+        return Response([compiled.represent(row) for row in rows])
+
+    def get_compiled_rows(self, compiled):
+        """The values() rows `compiled.represent` renders."""
+        columns = compiled.sources
+        if self.paginator is not None:
+            columns += tuple(getattr(self.paginator, "position_fields", ()))
+        return (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .values(*dict.fromkeys(columns))
+        )
 
     def create(self, request, *args, **kwargs):
         raise exceptions.PermissionDenied("Not Allowed")
@@ -115,3 +534,226 @@ class ReadOnlyCoreViewSet(CoreViewSet):
 
     def destroy(self, request, *args, **kwargs):
         raise exceptions.PermissionDenied("Not Allowed")
+
+    def bulk(self, request, *args, **kwargs):
+        raise exceptions.PermissionDenied("Not Allowed")
+
+
+class AsyncCoreViewSet(CoreViewSet):
+    """CoreViewSet whose actions run on the event loop under ASGI.
+
+    list / retrieve / create / update / destroy use the async ORM, so a
+    slow client holds a coroutine instead of a worker thread. Work with
+    no async API yet (authentication, permissions, serializer validation
+    and rendering) runs through sync_to_async, as do sync actions such
+    as `bulk` and any sync override in a subclass.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        # keeps cls / actions / csrf_exempt, Django sees a coroutine function
+        return functools.update_wrapper(async_view, view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        with route_request(request, self.is_read_only_request(request)):
+            return await self.adispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """APIView.dispatch, awaiting async handlers."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self):
+        """Async version of get_object."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, exceptions.ValidationError, TypeError, ValueError):
+            raise Http404
+        await sync_to_async(self.check_object_permissions)(self.request, obj)
+        return obj
+
+    async def aget_serializer_data(self, serializer):
+        """`serializer.data`, rendered off the event loop because fields
+        may still load relations."""
+        return await sync_to_async(lambda: serializer.data)()
+
+    async def apaginate_queryset(self, queryset):
+        """Async version of paginate_queryset. Paginators without an
+        `apaginate_queryset` of their own run in a thread."""
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if hasattr(paginator, "apaginate_queryset"):
+            return await paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(paginator.paginate_queryset)(
+            queryset, self.request, view=self
+        )
+
+    async def apaginate_this_response(
+        self,
+        queryset: QuerySet,
+        serializer: serializers.Serializer = None,
+    ):
+        """Async version of paginate_this_response."""
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            if serializer is None:
+                serialized = self.serializer_class(page, many=True)  # type: ignore
+            else:
+                serialized = serializer(page, many=True)  # type: ignore
+            return self.get_paginated_response(await self.aget_serializer_data(serialized))
+        return None
+
+    async def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        response = await self.apaginate_this_response(queryset, self.get_serializer)
+        if response is not None:
+            return response
+        objects = [obj async for obj in queryset]
+        return Response(await self.aget_serializer_data(self.get_serializer(objects, many=True)))
+
+    async def retrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(await self.aget_serializer_data(self.get_serializer(instance)))
+
+    async def aperform_create(self, serializer):
+        if hasattr(serializer, "acreate"):
+            return await serializer.acreate(serializer.validated_data)
+        return await sync_to_async(self.perform_create)(serializer)
+
+    async def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        await self.aperform_create(serializer)
+        data = await self.aget_serializer_data(serializer)
+        headers = self.get_success_headers(data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
+    async def aperform_update(self, serializer):
+        if hasattr(serializer, "aupdate"):
+            serializer.instance = await serializer.aupdate(
+                serializer.instance, serializer.validated_data
+            )
+        else:
+            await sync_to_async(self.perform_update)(serializer)
+
+    async def update(self, request, *args, **kwargs):
+        partial = kwargs.pop("partial", False)
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        await self.aperform_update(serializer)
+        if getattr(instance, "_prefetched_objects_cache", None):
+            instance._prefetched_objects_cache = {}
+        return Response(await self.aget_serializer_data(serializer))
+
+    async def partial_update(self, request, *args, **kwargs):
+        kwargs["partial"] = True
+        return await self.update(request, *args, **kwargs)
+
+    async def aperform_destroy(self, instance):
+        await instance.adelete()
+
+    async def destroy(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        await self.aperform_destroy(instance)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncReadOnlyCoreViewSet(ReadOnlyCoreViewSet, AsyncCoreViewSet):
+    """ReadOnlyCoreViewSet with the async list / retrieve of
+    AsyncCoreViewSet, keeping the compiled list and the ETag handling."""
+
+    async def aget_conditional_response(self, request, state, render, last_modified=None):
+        """Async version of get_conditional_response, `render` is a
+        coroutine function."""
+        etag = self.get_etag(request, state)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = self.get_not_modified_response(request, etag, timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        data = self.get_cached_data(etag)
+        if data is None:
+            data = (await render()).data
+            self.set_cached_data(etag, data)
+        return self.get_etag_response(data, etag, timestamp)
+
+    async def retrieve(self, request, *args, **kwargs):
+        if not self.supports_conditional_get():
+            return await AsyncCoreViewSet.retrieve(self, request, *args, **kwargs)
+        instance = await self.aget_object()
+
+        async def render():
+            return Response(await self.aget_serializer_data(self.get_serializer(instance)))
+
+        return await self.aget_conditional_response(
+            request,
+            (instance.pk, instance.updated_at),
+            render,
+            last_modified=instance.updated_at,
+        )
+
+    async def list(self, request, *args, **kwargs):
+        if not self.supports_conditional_get():
+            return await self.arender_list(request, *args, **kwargs)
+        state = await self.filter_queryset(self.get_queryset()).aaggregate(
+            last_modified=Max("updated_at"), count=Count("pk")
+        )
+        return await self.aget_conditional_response(
+            request,
+            (state["last_modified"], state["count"]),
+            lambda: self.arender_list(request, *args, **kwargs),
+        )
+
+    async def arender_list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_representation()
+        if compiled is None:
+            return await AsyncCoreViewSet.list(self, request, *args, **kwargs)
+
+        rows = self.get_compiled_rows(compiled)
+        page = await self.apaginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([compiled.represent(row) for row in page])
+        return Response([compiled.represent(row) async for row in rows])
+
+
+class InstrumentationReportView(APIView):
+    """Staff-only dump of the InstrumentationMiddleware statistics of the
+    process serving the request. DELETE starts a new measurement."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(recorder.snapshot())
+
+    def delete(self, request):
+        recorder.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "core"
+
+    def ready(self):
+        from django.core import checks
+        from django.db.backends.signals import connection_created
+
+        from core.db import configure_sqlite
+        from core.routers import check_sticky_cache
+
+        connection_created.connect(configure_sqlite, dispatch_uid="core.db.configure_sqlite")
+        checks.register(check_sticky_cache, checks.Tags.caches)
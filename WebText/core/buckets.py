@@ -0,0 +1,152 @@
+"""
+This file is used to define the time bucketing of querysets for the game
+
+HOW TO:
+1. Count rows per month: `bucket_aggregate(queryset, start, end)`
+2. Pass aggregates to compute other values: `bucket_aggregate(qs, start, end, score=Sum("score"))`
+3. Use `period="week"` or `period="day"` for smaller buckets
+4. Walk an open-ended range lazily with `iter_bucket_aggregates(queryset, start)`
+
+This File Does:
+
+1. Defines the Bucket namedtuple
+2. Defines the bucket_start and iter_buckets functions
+3. Defines the bucket_aggregate function, one GROUP BY query per range
+4. Defines the iter_bucket_aggregates generator
+
+"""
+
+import datetime
+from collections import namedtuple
+from itertools import islice
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+# start: first day of the bucket, end: first day of the next one,
+# values: {aggregate name: value}
+Bucket = namedtuple("Bucket", ["start", "end", "values"])
+
+PERIODS = {
+    "month": (TruncMonth, relativedelta(months=1)),
+    "week": (TruncWeek, relativedelta(weeks=1)),
+    "day": (TruncDay, relativedelta(days=1)),
+}
+
+
+def get_period(period):
+    try:
+        return PERIODS[period]
+    except KeyError:
+        raise ValueError(f"Unknown period {period!r}, use one of {', '.join(PERIODS)}")
+
+
+def to_date(value):
+    """Accept a date, a datetime or an ISO "YYYY-MM-DD" string."""
+    if isinstance(value, str):
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(f"Invalid date {value!r}")
+        return parsed
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+def to_datetime(value):
+    """Midnight of the date `value` in the current time zone."""
+    value = datetime.datetime.combine(value, datetime.time.min)
+    if timezone.is_naive(value) and timezone.now().tzinfo is not None:
+        value = timezone.make_aware(value)
+    return value
+
+
+def bucket_start(value, period="month"):
+    """The first day of the bucket holding the date `value`, weeks start
+    on Monday like TruncWeek."""
+    get_period(period)
+    value = to_date(value)
+    if period == "month":
+        return value.replace(day=1)
+    if period == "week":
+        return value - datetime.timedelta(days=value.weekday())
+    return value
+
+
+def iter_buckets(start, end=None, period="month"):
+    """Yield `(start, end)` of every bucket from the one holding `start`
+    to the one holding `end`, forever when `end` is None."""
+    step = get_period(period)[1]
+    first = bucket_start(start, period)
+    last = None if end is None else to_date(end)
+    index = 0
+    while True:
+        current = first + step * index
+        if last is not None and current > last:
+            return
+        yield current, first + step * (index + 1)
+        index += 1
+
+
+def get_empty_values(aggregates):
+    # COUNT of nothing is 0, SUM / AVG / MAX of nothing is NULL
+    return {
+        name: 0 if isinstance(aggregate, Count) else None
+        for name, aggregate in aggregates.items()
+    }
+
+
+def fetch_buckets(queryset, buckets, period, field, aggregates):
+    """Aggregate `queryset` over the consecutive `buckets` with one
+    GROUP BY query and fill the buckets without rows."""
+    if not buckets:
+        return []
+    trunc = get_period(period)[0]
+    rows = (
+        queryset.filter(
+            **{
+                f"{field}__gte": to_datetime(buckets[0][0]),
+                f"{field}__lt": to_datetime(buckets[-1][1]),
+            }
+        )
+        .annotate(bucket=trunc(field))
+        .order_by()
+        .values("bucket")
+        .annotate(**aggregates)
+    )
+    found = {}
+    for row in rows:
+        bucket = row.pop("bucket")
+        found[to_date(bucket)] = row
+    empty = get_empty_values(aggregates)
+    return [
+        Bucket(start, end, found.get(start, dict(empty)))
+        for start, end in buckets
+    ]
+
+
+def bucket_aggregate(queryset, start, end, period="month", field="created_at", **aggregates):
+    """Return a Bucket per period from `start` to `end` (both included)
+    with the `aggregates` of the rows whose `field` falls inside it,
+    `count=Count("pk")` when none are given. One query for the whole
+    range, buckets without rows get 0 for counts and None otherwise."""
+    aggregates = aggregates or {"count": Count("pk")}
+    buckets = list(iter_buckets(start, end, period))
+    return fetch_buckets(queryset, buckets, period, field, aggregates)
+
+
+def iter_bucket_aggregates(
+    queryset, start, end=None, period="month", field="created_at", chunk_size=12, **aggregates
+):
+    """Lazy form of bucket_aggregate, one query per `chunk_size` buckets.
+    Without `end` it never stops, take what you need with islice."""
+    aggregates = aggregates or {"count": Count("pk")}
+    buckets = iter_buckets(start, end, period)
+    while chunk := list(islice(buckets, chunk_size)):
+        yield from fetch_buckets(queryset, chunk, period, field, aggregates)
@@ -0,0 +1,91 @@
+"""
+This file is used to define the in-process caches for the game
+
+This File Does:
+
+1. Defines the LRUCache class
+2. Defines the ResponseCache class
+
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded cache with least-recently-used eviction.
+
+    Every entry may carry its own timeout (in seconds), after which it
+    is treated as missing. The cache lives in the process memory, so it
+    is not shared between workers.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value stored for `key`, or `default` if it is
+        missing or expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Store `value` for `key`. A `timeout` of None never expires."""
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    """LRU cache of rendered response payloads, grouped by model label.
+
+    `invalidate(label)` bumps the generation of that model, so every
+    entry stored before it is unreachable and ages out of the LRU.
+    """
+
+    def __init__(self, maxsize=512):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._generations = {}
+
+    def get_generation(self, label):
+        return self._generations.get(label, 0)
+
+    def get(self, label, key, default=None):
+        return self._cache.get((label, self.get_generation(label), key), default)
+
+    def set(self, label, key, value, timeout=None):
+        self._cache.set((label, self.get_generation(label), key), value, timeout)
+
+    def invalidate(self, label):
+        self._generations[label] = self.get_generation(label) + 1
+
+    def clear(self):
+        self._cache.clear()
@@ -0,0 +1,94 @@
+"""
+This file is used to define the settings of the core app
+
+HOW TO:
+1. Add a `CORE` dict to the project settings
+2. Override only the keys you need, everything else falls back to DEFAULTS
+
+This File Does:
+
+1. Defines the DEFAULTS dict
+2. Defines the core_setting function
+3. Defines DERIVATIVE_DIR, shared by core.uploads and core.static without
+   importing one from the other
+
+"""
+
+from django.conf import settings
+
+
+# under MEDIA_ROOT, core.uploads writes the image derivatives there and
+# core.static serves them as immutable
+DERIVATIVE_DIR = "derivatives"
+
+DEFAULTS = {
+    # CoreViewSet.get_user cache
+    "USER_CACHE_SIZE": 1024,
+    "USER_CACHE_TTL": 300,
+    # core.tokens.verified_tokens
+    "TOKEN_CACHE_SIZE": 4096,
+    # CoreViewSet.bulk
+    "BULK_BATCH_SIZE": 500,
+    # ReadOnlyCoreViewSet.cache_responses
+    "RESPONSE_CACHE_SIZE": 512,
+    "RESPONSE_CACHE_TTL": 60,
+    # core.middlewares.InstrumentationMiddleware
+    "INSTRUMENTATION": True,
+    "INSTRUMENTATION_SAMPLE_RATE": 1.0,
+    "INSTRUMENTATION_WINDOW": 1024,
+    "N_PLUS_ONE_THRESHOLD": 5,
+    # core.pagination.EstimatedCountPaginator
+    "ESTIMATED_COUNT_THRESHOLD": 100000,
+    # BaseListView.row_template_name
+    "ROW_CACHE_TTL": 300,
+    # core.middlewares.LoginMiddleware, STATIC_URL and MEDIA_URL are always exempt,
+    # paths ending with "/" exempt everything under them, the others only themselves
+    "LOGIN_EXEMPT_PATHS": [
+        "/doc/",
+        "/doc.json",
+        "/doc.yaml",
+        "/redoc/",
+        "/api/",
+        "/admin/",
+        "/__debug__/",
+        "/__instrumentation__/",
+    ],
+    "LOGIN_EXEMPT_ROUTES": ["login", "logout"],
+    # core.db.configure_sqlite, {} leaves SQLite at its defaults
+    "SQLITE_PRAGMAS": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 134217728,
+        "cache_size": -20000,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+    # core.routers, aliases of DATABASES that replicate "default"
+    "READ_DATABASES": [],
+    "READ_STICKY_SECONDS": 5,
+    # alias of CACHES that remembers who wrote, every worker must share it
+    # (Redis, memcached, the database cache), a per-process cache only keeps
+    # a client on the primary while it talks to the same worker
+    "READ_STICKY_CACHE": "default",
+    "REPLICA_MAX_LAG": 5,
+    "REPLICA_CHECK_INTERVAL": 10,
+    # core.schema.SchemaCache, files of `build_schema` and the url written in them
+    "SCHEMA_DIR": None,
+    "SCHEMA_URL": None,
+    # import_profile command, milliseconds for the whole startup and per package
+    "IMPORT_TIME_BUDGET": 1500,
+    "IMPORT_TIME_MODULE_BUDGET": 200,
+    # core.static handlers, serve MEDIA_ROOT too, off unless it is set explicitly
+    "SERVE_MEDIA": False,
+    # core.static.CompressedManifestStaticFilesStorage, smaller files aren't compressed
+    "STATIC_COMPRESS_MIN_SIZE": 256,
+    # core.uploads, {name: [width, height]} of the derivatives of uploaded images
+    "IMAGE_DERIVATIVES": {"thumbnail": [320, 320]},
+    "IMAGE_WORKERS": 2,
+    "IMAGE_QUEUE_SIZE": 64,
+}
+
+
+def core_setting(name):
+    """Return the value of `name` from `settings.CORE`, or its default."""
+    return getattr(settings, "CORE", {}).get(name, DEFAULTS[name])
@@ -0,0 +1,41 @@
+"""
+This file is used to define the database connection setup for the game
+
+HOW TO:
+1. Keep "core" in INSTALLED_APPS, CoreConfig connects the hook
+2. Tune CORE["SQLITE_PRAGMAS"], an empty dict turns the profile off
+3. Compare profiles with `python manage.py sqlite_benchmark`
+4. Set SQLITE_TRANSACTION_MODE=IMMEDIATE in the environment when several
+   workers write, see DATABASES in WebText/settings.py
+
+This File Does:
+
+1. Defines the get_pragma_statements function
+2. Defines the configure_sqlite connection_created hook
+
+"""
+
+from core.conf import core_setting
+
+
+def get_pragma_statements(pragmas):
+    """Turn `{name: value}` into `PRAGMA name = value` statements."""
+    return [f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply CORE["SQLITE_PRAGMAS"] to every new SQLite connection.
+
+    WAL lets readers run next to the single writer, synchronous=NORMAL
+    only syncs at checkpoints, which is durable enough under WAL, and
+    busy_timeout makes a blocked writer wait instead of failing with
+    "database is locked".
+    """
+    if connection.vendor != "sqlite":
+        return
+    pragmas = core_setting("SQLITE_PRAGMAS")
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for statement in get_pragma_statements(pragmas):
+            cursor.execute(statement)
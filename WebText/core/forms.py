@@ -9,21 +9,50 @@ HOW TO:
 
 This File Does:
 
-1. Defines the BasicForm class
-2. Defines the BasicDeleteForm class
+1. Defines the StaticFragment layout object
+2. Defines the BasicForm class
+3. Defines the BasicDeleteForm class
 
 """
 
 
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Button, Field, Fieldset, Layout, Submit, HTML
+from crispy_forms.utils import TEMPLATE_PACK
 from django import forms
 from django.db import models
 
 
+class StaticFragment:
+    """Layout object whose HTML is rendered once and then reused.
+
+    Wrap parts of a layout that don't depend on the bound data or on the
+    page context, like the card header or the submit button. Inside a
+    compiled layout the fragment belongs to a single form class, so the
+    cache is effectively keyed by form class and template pack.
+    """
+
+    def __init__(self, layout_object):
+        self.layout_object = layout_object
+        self.rendered = {}
+
+    def render(self, form, context, template_pack=TEMPLATE_PACK, **kwargs):
+        html = self.rendered.get(template_pack)
+        if html is None:
+            html = self.layout_object.render(
+                form, context, template_pack=template_pack, **kwargs
+            )
+            self.rendered[template_pack] = html
+        return html
+
+
 class BasicForm(forms.Form):
     """FORM to Use in other FORMS"""
 
+    # the layout is built once per class and shared by all its instances,
+    # set to False when `get_layout` depends on the instance
+    compile_layout = True
+
     def __init__(self, *args, **kwargs):
         """
         The function initializes a form with specific attributes and layout for a Django model.
@@ -32,7 +61,19 @@ class BasicForm(forms.Form):
         self.helper = FormHelper()
         self.helper.form_method = "post"
         self.helper.form_class = "form w-100"
-        self.helper.layout = self.get_layout()
+        self.helper.layout = self.get_compiled_layout()
+
+    def get_compiled_layout(self):
+        """Return the layout shared by every instance of this form class,
+        building it on first use. Copy it before changing it in place."""
+        cls = type(self)
+        if not cls.compile_layout:
+            return self.get_layout()
+        layout = cls.__dict__.get("_compiled_layout")
+        if layout is None:
+            layout = self.get_layout()
+            cls._compiled_layout = layout
+        return layout
 
     def get_layout(self):
         """This code snippet is defining a method `get_layout` within the `BaseForm` class.
@@ -40,7 +81,9 @@ class BasicForm(forms.Form):
         the form based on the fields defined in the form class.
         """
         layout = Layout()
-        layout.append(HTML(f'<div class="card-header">{self.Meta.verbose_name}</div>'))
+        layout.append(
+            StaticFragment(HTML(f'<div class="card-header">{self.Meta.verbose_name}</div>'))
+        )
         for field_name in self.form_fields():
             layout.append(
                 Field(
@@ -49,7 +92,7 @@ class BasicForm(forms.Form):
                     css_class="form-control bg-transparent",
                 )
             )
-        layout.append(Submit("submit", "Submit", css_class="btn btn-primary"))
+        layout.append(StaticFragment(Submit("submit", "Submit", css_class="btn btn-primary")))
         return layout
 
     def get_initial(self, instance=None):
@@ -87,4 +130,4 @@ class BasicDeleteForm(BasicForm):
         super().__init__(*args, **kwargs)
 
     def get_layout(self):
-        return Layout(Submit("delete", "Delete", css_class="btn btn-primary"))
+        return Layout(StaticFragment(Submit("delete", "Delete", css_class="btn btn-primary")))
@@ -0,0 +1,181 @@
+"""
+This file is used to define the request instrumentation for the game
+
+HOW TO:
+1. Keep `core.middlewares.InstrumentationMiddleware` in MIDDLEWARE
+2. Set `instrumented = True` on any view class that should be recorded
+3. Read the report from `recorder.snapshot()` or the `__instrumentation__/` endpoint
+
+This File Does:
+
+1. Defines the sql_shape function
+2. Defines the QueryCollector class
+3. Defines the Histogram and ViewStats classes
+4. Defines the Recorder class and the process-wide recorder
+
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import ExitStack
+
+from django.db import connections
+
+from core.conf import core_setting
+
+
+IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def sql_shape(sql):
+    """Collapse `IN (%s, %s, ...)` lists so queries that only differ in
+    the number of parameters share one shape."""
+    if "IN (" in sql:
+        return IN_LIST.sub("IN (...)", sql)
+    return sql
+
+
+class QueryCollector:
+    """Counts and times every query run while it is installed on the
+    database connections of the current thread."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.shapes = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def installed(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def repeated_shapes(self, threshold):
+        """Shapes run at least `threshold` times, the usual N+1 sign."""
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+class Histogram:
+    """Keeps the last `window` samples; percentiles are computed when
+    read, so recording stays O(1)."""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+
+    def add(self, value):
+        self.samples.append(value)
+
+    def summary(self):
+        values = sorted(self.samples)
+        if not values:
+            return {}
+
+        def percentile(p):
+            return values[min(len(values) - 1, int(p * len(values)))]
+
+        return {
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": values[-1],
+        }
+
+
+class ViewStats:
+    def __init__(self, window):
+        self.count = 0
+        self.errors = 0
+        self.wall_ms = Histogram(window)
+        self.queries = Histogram(window)
+        self.db_ms = Histogram(window)
+        self.bytes = Histogram(window)
+        self.n_plus_one = 0
+        # repeated SQL shape -> repeat count of its latest occurrence
+        self.n_plus_one_examples = OrderedDict()
+
+    def add_n_plus_one(self, repeated, keep=5):
+        self.n_plus_one += 1
+        for shape, count in repeated.items():
+            self.n_plus_one_examples.pop(shape, None)
+            self.n_plus_one_examples[shape] = count
+        while len(self.n_plus_one_examples) > keep:
+            self.n_plus_one_examples.popitem(last=False)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "wall_ms": self.wall_ms.summary(),
+            "queries": self.queries.summary(),
+            "db_ms": self.db_ms.summary(),
+            "bytes": self.bytes.summary(),
+            "n_plus_one": {
+                "count": self.n_plus_one,
+                "examples": [
+                    {"sql": shape, "count": count}
+                    for shape, count in self.n_plus_one_examples.items()
+                ],
+            },
+        }
+
+
+class Recorder:
+    """Rolling per view/action statistics of the current process."""
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, wall, collector, size=None, status_code=200):
+        repeated = collector.repeated_shapes(core_setting("N_PLUS_ONE_THRESHOLD"))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = ViewStats(self.window)
+            stats.count += 1
+            if status_code >= 500:
+                stats.errors += 1
+            stats.wall_ms.add(wall * 1000)
+            stats.queries.add(collector.count)
+            stats.db_ms.add(collector.time * 1000)
+            if size is not None:
+                stats.bytes.add(size)
+            if repeated:
+                stats.add_n_plus_one(repeated)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: stats.summary() for key, stats in sorted(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+recorder = Recorder(window=core_setting("INSTRUMENTATION_WINDOW"))
+
+
+def get_view_key(request):
+    """Return "module.View.action" for views that set `instrumented`,
+    None for everything else."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, "cls", None) or getattr(match.func, "view_class", None)
+    if not getattr(view_class, "instrumented", False):
+        return None
+    actions = getattr(match.func, "actions", None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f"{view_class.__module__}.{view_class.__qualname__}.{action}"
@@ -0,0 +1,45 @@
+"""
+This file is used to define the build_schema command for the game
+
+HOW TO:
+1. Set CORE["SCHEMA_DIR"], or pass `--output`
+2. Run `python manage.py build_schema --url https://api.example.com` on every deploy
+
+This File Does:
+
+1. Finds the SchemaCache behind the "schema-json" url
+2. Writes the rendered JSON and YAML schema to the directory
+
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import NoReverseMatch, resolve, reverse
+
+from core.conf import core_setting
+
+
+class Command(BaseCommand):
+    help = "Render the OpenAPI schema once and write it for the schema views to serve"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help='directory, CORE["SCHEMA_DIR"] by default')
+        parser.add_argument(
+            "--url", help='scheme and host of the API, CORE["SCHEMA_URL"] by default'
+        )
+        parser.add_argument("--url-name", default="schema-json", help="name of the schema url")
+
+    def handle(self, *args, **options):
+        directory = options["output"] or core_setting("SCHEMA_DIR")
+        if not directory:
+            raise CommandError('Pass --output or set CORE["SCHEMA_DIR"].')
+        try:
+            path = reverse(options["url_name"], kwargs={"format": ".json"})
+        except NoReverseMatch:
+            raise CommandError(f"No url named {options['url_name']!r} with a format kwarg.")
+        schema_cache = getattr(resolve(path).func, "schema_cache", None)
+        if schema_cache is None:
+            raise CommandError(f"{options['url_name']!r} is not a SchemaCache view.")
+
+        url = options["url"] or schema_cache.get_url()
+        for path in schema_cache.write(directory, url):
+            self.stdout.write(f"wrote {path}")
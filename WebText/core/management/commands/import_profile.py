@@ -0,0 +1,115 @@
+"""
+This file is used to define the import_profile command for the game
+
+HOW TO:
+1. Run `python manage.py import_profile`, or with `--settings=WebText.production`
+2. Pass `--modules` to list the slowest modules instead of packages
+3. Set CORE["IMPORT_TIME_BUDGET"] / CORE["IMPORT_TIME_MODULE_BUDGET"] in
+   milliseconds, the command fails when the startup goes over them
+
+This File Does:
+
+1. Starts a fresh interpreter with `-X importtime` that loads the settings,
+   the apps, the middleware and the urlconf, like a worker does
+2. Adds up the import time of every top level package
+3. Compares the startup and every package with the budgets
+
+"""
+
+import os
+import sys
+import subprocess
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.conf import core_setting
+
+
+# what a WSGI worker imports before it serves its first request
+STARTUP = (
+    "from django.core.wsgi import get_wsgi_application\n"
+    "get_wsgi_application()\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+
+def parse_importtime(output):
+    """{module: self time in microseconds} of the `-X importtime` output."""
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, _, name = line[len("import time:") :].split("|")
+        if not self_time.strip().isdigit():
+            # the header line
+            continue
+        times[name.strip()] = int(self_time)
+    return times
+
+
+def group_by_package(times):
+    packages = defaultdict(int)
+    for name, self_time in times.items():
+        packages[name.split(".")[0]] += self_time
+    return dict(packages)
+
+
+class Command(BaseCommand):
+    help = "Report the import time of a worker's startup against the configured budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument(
+            "--modules", action="store_true", help="list modules instead of top level packages"
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="keep the fastest of N runs")
+        parser.add_argument("--budget", type=float, help='ms, CORE["IMPORT_TIME_BUDGET"] by default')
+        parser.add_argument(
+            "--module-budget", type=float, help='ms, CORE["IMPORT_TIME_MODULE_BUDGET"] by default'
+        )
+
+    def handle(self, *args, **options):
+        budget = options["budget"] or core_setting("IMPORT_TIME_BUDGET")
+        module_budget = options["module_budget"] or core_setting("IMPORT_TIME_MODULE_BUDGET")
+
+        # the first run also writes the .pyc files, keep the fastest
+        times = min(
+            (self.measure() for _ in range(max(options["repeat"], 1))),
+            key=lambda times: sum(times.values()),
+        )
+        rows = times if options["modules"] else group_by_package(times)
+        total = sum(times.values()) / 1000
+
+        self.stdout.write(f"{settings.SETTINGS_MODULE}: {len(times)} modules in {total:.1f} ms")
+        self.stdout.write(f"{'module' if options['modules'] else 'package':<50}{'ms':>10}")
+        over = []
+        for name, self_time in sorted(rows.items(), key=lambda row: -row[1])[: options["top"]]:
+            line = f"{name:<50}{self_time / 1000:>10.1f}"
+            if module_budget and self_time / 1000 > module_budget:
+                over.append(name)
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+
+        if over:
+            self.stdout.write(
+                self.style.WARNING(f"{len(over)} over the {module_budget} ms budget: {', '.join(over)}")
+            )
+        if budget and total > budget:
+            raise CommandError(f"Startup imports take {total:.1f} ms, the budget is {budget} ms.")
+
+    def measure(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP],
+            env=env,
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"The startup failed:\n{result.stderr[-2000:]}")
+        return parse_importtime(result.stderr)
@@ -0,0 +1,85 @@
+"""
+This file is used to define the provision_users command
+
+HOW TO:
+1. From a CSV with a header row: `python manage.py provision_users --csv school.csv --output credentials.csv`
+2. Numbered accounts: `python manage.py provision_users --count 30000 --prefix student --output credentials.csv`
+3. Hand out the generated `username,password` pairs of the output file
+
+This File Does:
+
+1. Reads or builds the account rows
+2. Creates the users with core.provisioning.provision_users
+3. Writes the generated credentials to the output CSV
+
+"""
+
+import csv
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = "Create many users at once with generated passwords"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default=settings.AUTH_USER_MODEL, help="app_label.Model")
+        parser.add_argument("--csv", help="CSV file, one column per model field")
+        parser.add_argument("--count", type=int, default=0, help="numbered accounts to create")
+        parser.add_argument("--prefix", default="user", help="username prefix used with --count")
+        parser.add_argument("--start", type=int, default=1, help="first number used with --count")
+        parser.add_argument("--output", required=True, help="CSV file for the credentials")
+        parser.add_argument("--length", type=int, default=12, help="password length")
+        parser.add_argument("--workers", type=int, default=None, help="hashing processes")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def get_rows(self, options, username_field):
+        if options["csv"]:
+            with open(options["csv"], newline="") as file:
+                rows = list(csv.DictReader(file))
+            if rows and username_field not in rows[0]:
+                raise CommandError(f"{options['csv']} has no {username_field!r} column")
+            return rows
+        if options["count"]:
+            first = options["start"]
+            return [
+                {username_field: f"{options['prefix']}{number}"}
+                for number in range(first, first + options["count"])
+            ]
+        raise CommandError("Pass --csv or --count")
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as exc:
+            raise CommandError(str(exc))
+        rows = self.get_rows(options, model.USERNAME_FIELD)
+
+        start = time.perf_counter()
+        created, skipped, errors = provision_users(
+            model,
+            rows,
+            password_length=options["length"],
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+        )
+        elapsed = time.perf_counter() - start
+        for error in errors:
+            # the header is line 1 of a CSV
+            line = f"line {error['index'] + 2}" if options["csv"] else f"row {error['index']}"
+            self.stderr.write(f"{line}: {' '.join(error['errors'])}")
+
+        with open(options["output"], "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow([model.USERNAME_FIELD, "password"])
+            writer.writerows(created)
+        self.stdout.write(
+            f"created {len(created)} users in {elapsed:.1f}s, "
+            f"skipped {len(skipped)} existing and {len(errors)} invalid, "
+            f"credentials in {options['output']}"
+        )
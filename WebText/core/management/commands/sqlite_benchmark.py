@@ -0,0 +1,143 @@
+"""
+This file is used to define the sqlite_benchmark command for the game
+
+HOW TO:
+1. Run `python manage.py sqlite_benchmark`
+2. Pass `--readers`, `--writers` and `--duration` to change the load
+
+This File Does:
+
+1. Runs the same concurrent read / write load against a throw-away SQLite
+   file, once with SQLite's defaults and once with CORE["SQLITE_PRAGMAS"]
+2. Prints reads/s, writes/s and "database is locked" errors of each profile
+
+"""
+
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from core.conf import core_setting
+from core.db import get_pragma_statements
+
+
+class Command(BaseCommand):
+    help = "Compare SQLite read/write throughput with and without the core storage profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--duration", type=float, default=5.0, help="seconds per profile")
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument(
+            "--timeout", type=float, default=5.0, help="sqlite3 busy timeout, Django's default"
+        )
+
+    def handle(self, *args, **options):
+        profiles = [
+            ("default", [], "BEGIN"),
+            (
+                "tuned",
+                get_pragma_statements(core_setting("SQLITE_PRAGMAS")),
+                "BEGIN IMMEDIATE",
+            ),
+        ]
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, "
+            f"{options['duration']}s per profile"
+        )
+        self.stdout.write(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'errors':>10}")
+        with tempfile.TemporaryDirectory() as directory:
+            for name, pragmas, begin in profiles:
+                path = Path(directory) / f"{name}.sqlite3"
+                result = self.run_profile(path, pragmas, begin, options)
+                self.stdout.write(
+                    f"{name:<10}{result['reads']:>12.0f}{result['writes']:>12.0f}"
+                    f"{result['errors']:>10}"
+                )
+
+    def connect(self, path, pragmas, options):
+        connection = sqlite3.connect(
+            path, timeout=options["timeout"], isolation_level=None, check_same_thread=False
+        )
+        for statement in pragmas:
+            connection.execute(statement)
+        return connection
+
+    def setup(self, path, pragmas, options):
+        connection = self.connect(path, pragmas, options)
+        connection.execute(
+            "CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT, level INTEGER)"
+        )
+        connection.execute("BEGIN")
+        connection.executemany(
+            "INSERT INTO item (name, level) VALUES (?, ?)",
+            ((f"item {i}", i % 100) for i in range(options["rows"])),
+        )
+        connection.execute("COMMIT")
+        connection.close()
+
+    def run_profile(self, path, pragmas, begin, options):
+        self.setup(path, pragmas, options)
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+        rows = options["rows"]
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            connection = self.connect(path, pragmas, options)
+            while not stop.is_set():
+                level = random.randrange(100)
+                try:
+                    connection.execute(
+                        "SELECT COUNT(*), MAX(id) FROM item WHERE level = ?", (level,)
+                    ).fetchone()
+                except sqlite3.OperationalError:
+                    count("errors")
+                else:
+                    count("reads")
+            connection.close()
+
+        def writer():
+            connection = self.connect(path, pragmas, options)
+            while not stop.is_set():
+                pk = random.randrange(1, rows + 1)
+                try:
+                    # read-then-write, like a form view saving an object
+                    connection.execute(begin)
+                    connection.execute("SELECT level FROM item WHERE id = ?", (pk,)).fetchone()
+                    connection.execute("UPDATE item SET level = level + 1 WHERE id = ?", (pk,))
+                    connection.execute("COMMIT")
+                except sqlite3.OperationalError:
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                    count("errors")
+                else:
+                    count("writes")
+            connection.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options["readers"])]
+        threads += [threading.Thread(target=writer) for _ in range(options["writers"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options["duration"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        return {
+            "reads": counts["reads"] / elapsed,
+            "writes": counts["writes"] / elapsed,
+            "errors": counts["errors"],
+        }
@@ -1,14 +1,132 @@
-from django.shortcuts import redirect
+import random
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.conf import core_setting
+from core.instrumentation import QueryCollector, get_view_key, recorder
+
+
+def compile_exempt_paths(prefixes):
+    """Compile URL paths into one anchored regex, longest first. A path
+    ending with "/" matches everything under it, any other path only
+    itself. Relative paths like STATIC_URL = "static/" get a leading
+    slash and absolute URLs (a CDN) are ignored. Returns None when
+    nothing is left."""
+    paths = set()
+    for prefix in prefixes:
+        if not prefix or "://" in prefix or prefix.startswith("//"):
+            continue
+        paths.add(prefix if prefix.startswith("/") else f"/{prefix}")
+    if not paths:
+        return None
+    pattern = "|".join(
+        re.escape(path) if path.endswith("/") else rf"{re.escape(path)}\Z"
+        for path in sorted(paths, key=len, reverse=True)
+    )
+    return re.compile(f"^(?:{pattern})")
+
 
 class LoginMiddleware:
+    """Redirects anonymous users to the login page.
+
+    Requests under one of the exempt path prefixes (static and media
+    files, the API docs, the JWT authenticated API) or resolving to an
+    exempt route name never touch `request.user`, so neither the session
+    nor the user is loaded for them. Put it after AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+    login_url = "login"
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.exempt_paths = compile_exempt_paths(
+            [settings.STATIC_URL, settings.MEDIA_URL]
+            + list(core_setting("LOGIN_EXEMPT_PATHS"))
+        )
+        self.exempt_routes = frozenset(core_setting("LOGIN_EXEMPT_ROUTES"))
+
+    def is_exempt_path(self, path):
+        return self.exempt_paths is not None and self.exempt_paths.match(path) is not None
 
     def __call__(self, request):
+        if self.is_exempt_path(request.path_info):
+            request.login_exempt = True
+        # under ASGI this returns the coroutine of the next middleware
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(request, "login_exempt", False):
+            return None
+        match = request.resolver_match
+        if match is not None and match.view_name in self.exempt_routes:
+            return None
         # Check if user is authenticated
         if not request.user.is_authenticated:
             # Redirect to login page
-            return redirect('login')
+            return redirect_to_login(request.get_full_path(), self.login_url)
+        return None
+
+
+class InstrumentationMiddleware:
+    """Records wall time, query count, DB time and payload size of every
+    view that sets `instrumented = True`, see core/instrumentation.py."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not core_setting("INSTRUMENTATION"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = core_setting("INSTRUMENTATION_SAMPLE_RATE")
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def is_sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.is_sampled():
+            return self.get_response(request)
+
+        collector = QueryCollector()
+        start = time.perf_counter()
+        with collector.installed():
+            response = self.get_response(request)
+        wall = time.perf_counter() - start
+        self.record(request, response, wall, collector)
+        return response
+
+    async def __acall__(self, request):
+        if not self.is_sampled():
+            return await self.get_response(request)
+
+        collector = QueryCollector()
+        start = time.perf_counter()
+        # the ORM of an ASGI request runs in that request's sync thread,
+        # so the collector is installed on the connections of that thread
+        installed = await sync_to_async(collector.installed)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(installed.close)()
+        wall = time.perf_counter() - start
+        self.record(request, response, wall, collector)
+        return response
 
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+    def record(self, request, response, wall, collector):
+        key = get_view_key(request)
+        if key is not None:
+            size = None if response.streaming else len(response.content)
+            recorder.record(key, wall, collector, size, response.status_code)
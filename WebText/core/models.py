@@ -6,6 +6,8 @@ class TimeStampedModel(models.Model):
 
     class Meta:
         abstract = True
+        # backs KeysetPagination, which walks rows in (created_at, id) order
+        indexes = [models.Index(fields=["created_at", "id"])]
 
 class NameModel(models.Model):
     name = models.CharField(max_length=255)
@@ -14,5 +16,5 @@ class NameModel(models.Model):
         abstract = True
 
 class BaseModel(TimeStampedModel, NameModel):
-    class Meta:
+    class Meta(TimeStampedModel.Meta):
         abstract = True
@@ -0,0 +1,282 @@
+"""
+This file is used to define the pagination classes for the game
+
+HOW TO:
+1. Set `keyset_pagination = True` on a CoreViewSet or BaseListView subclass
+2. Follow the `next` / `previous` links, add `?count=true` for a total
+3. Use EstimatedCountPaginator as `paginator_class` of a ListView to skip
+   COUNT(*) on big tables
+
+This File Does:
+
+1. Defines the encode_cursor and decode_cursor functions
+2. Defines the get_position and keyset_filter functions
+3. Defines the KeysetPagination class
+4. Defines the estimate_count function
+5. Defines the EstimatedCountPaginator class
+
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from core.conf import core_setting
+
+
+def encode_cursor(position, reverse=False):
+    """Encode a `(created_at, id)` position into an opaque cursor."""
+    created_at, pk = position
+    data = {"p": [created_at.isoformat(), pk], "r": int(reverse)}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into `((created_at, id), reverse)`.
+    Raises ValueError when the cursor was not made by encode_cursor."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at, pk = data["p"]
+        created_at = parse_datetime(created_at)
+    except (binascii.Error, TypeError, KeyError, ValueError):
+        raise ValueError("Invalid cursor")
+    if created_at is None:
+        raise ValueError("Invalid cursor")
+    return (created_at, pk), bool(data.get("r", 0))
+
+
+def get_position(item, fields=("created_at", "id")):
+    """Read the keyset position of a model instance or a values() row."""
+    if isinstance(item, dict):
+        return tuple(item[field] for field in fields)
+    return tuple(getattr(item, field) for field in fields)
+
+
+def keyset_filter(position, descending):
+    """Rows strictly after `position` in `(created_at, id)` order."""
+    created_at, pk = position
+    if descending:
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over `(created_at, id)` of a TimeStampedModel.
+
+    Every page is a single indexed range scan, so deep pages cost the same
+    as the first one. No COUNT(*) is issued unless `count_query_param`
+    is set to a true value.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    # newest rows first
+    descending = True
+    position_fields = ("created_at", "id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_query_params(self, request):
+        """DRF requests have `query_params`, plain Django ones `GET`."""
+        return getattr(request, "query_params", request.GET)
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    self.get_query_params(request)[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def wants_count(self, request):
+        value = self.get_query_params(request).get(self.count_query_param, "")
+        return value.lower() in ("1", "true", "yes")
+
+    def get_ordering(self, reverse):
+        descending = self.descending != reverse
+        prefix = "-" if descending else ""
+        return [f"{prefix}{field}" for field in self.position_fields]
+
+    def get_page_queryset(self, queryset, request):
+        """Return `(page queryset, has_cursor, reverse)` for the cursor of
+        `request`, or None when pagination is turned off. The page
+        queryset fetches one look-ahead row."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        position, reverse = None, False
+        cursor = self.get_query_params(request).get(self.cursor_query_param)
+        if cursor:
+            try:
+                position, reverse = decode_cursor(cursor)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+
+        page_queryset = queryset.order_by(*self.get_ordering(reverse))
+        if position is not None:
+            try:
+                page_queryset = page_queryset.filter(
+                    keyset_filter(position, self.descending != reverse)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return page_queryset[: self.page_size + 1], position is not None, reverse
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.get_page_queryset(queryset, request)
+        if page is None:
+            return None
+        page_queryset, has_cursor, reverse = page
+        self.count = queryset.count() if self.wants_count(request) else None
+        return self.set_page(list(page_queryset), has_cursor, reverse)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async version of paginate_queryset, used by AsyncCoreViewSet."""
+        page = self.get_page_queryset(queryset, request)
+        if page is None:
+            return None
+        page_queryset, has_cursor, reverse = page
+        self.count = await queryset.acount() if self.wants_count(request) else None
+        return self.set_page([item async for item in page_queryset], has_cursor, reverse)
+
+    def set_page(self, results, has_cursor, reverse):
+        """Trim the look-ahead row and remember the neighbour positions."""
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            # walking backwards: the page we came from is always next
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, has_cursor
+
+        self.next_position = None
+        self.previous_position = None
+        if results and has_next:
+            self.next_position = get_position(results[-1], self.position_fields)
+        if results and has_previous:
+            self.previous_position = get_position(results[0], self.position_fields)
+        self.page = results
+        return results
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, encode_cursor(position, reverse)
+        )
+
+    def get_next_link(self):
+        return self.get_link(self.next_position, False)
+
+    def get_previous_link(self):
+        return self.get_link(self.previous_position, True)
+
+    def get_paginated_response(self, data):
+        response = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.count is not None:
+            response["count"] = self.count
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer"},
+                "results": schema,
+            },
+        }
+
+
+ESTIMATE_QUERIES = {
+    # -1 until the table has been analyzed
+    "postgresql": "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+    # the first number of `stat` is the row count, filled by ANALYZE
+    "sqlite": "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+    "mysql": (
+        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    ),
+}
+
+
+def estimate_count(queryset):
+    """Return the row count of the table behind an unfiltered `queryset`
+    as kept in the database statistics, or None when the queryset is
+    filtered or no estimate is available."""
+    query = queryset.query
+    if query.where or query.distinct or query.is_sliced or query.combinator:
+        return None
+    connection = connections[queryset.db]
+    sql = ESTIMATE_QUERIES.get(connection.vendor)
+    if sql is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # e.g. sqlite_stat1 doesn't exist before the first ANALYZE
+        return None
+    if row is None or row[0] is None:
+        return None
+    try:
+        estimate = int(str(row[0]).split()[0])
+    except ValueError:
+        return None
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts the database statistics for big tables.
+
+    When the queryset is unfiltered and the estimated row count is at
+    least `threshold`, the estimate is used and no COUNT(*) is run;
+    `estimated` tells templates to show it as approximate. Everything
+    else gets the exact count.
+    """
+
+    def __init__(self, *args, threshold=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if threshold is None:
+            threshold = core_setting("ESTIMATED_COUNT_THRESHOLD")
+        self.threshold = threshold
+        self.estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = None
+        if hasattr(self.object_list, "query"):
+            estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= self.threshold:
+            self.estimated = True
+            return estimate
+        return super().count
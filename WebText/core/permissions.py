@@ -7,38 +7,29 @@ from rest_framework.permissions import BasePermission
 from rest_framework_simplejwt.authentication import api_settings
 from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
 
-HTTP_AUTHORIZATION = "HTTP_AUTHORIZATION"
+from core.tokens import TokenContext, extract_token, get_token_context, verify_token
+
 
 class CustomAuth(BasePermission):
     def has_permission(self, request, view):
-        raw_token = self._extract_token(request)
-        if raw_token:
-            return self._validate_token(raw_token)
+        context = get_token_context(request)
+        if context.raw_token:
+            return self._check_context(context)
         else:
             return False
 
     def _extract_token(self, request):
-        if HTTP_AUTHORIZATION in request.META.keys():
-            return request.META[HTTP_AUTHORIZATION].split()[-1]
-        else:
-            return None
+        return extract_token(request)
 
     def _validate_token(self, raw_token):
-        messages = []
-        for AuthToken in api_settings.AUTH_TOKEN_CLASSES:
-            try:
-                if AuthToken(raw_token):
-                    return True
-            except TokenError as e:
-                messages.append(
-                    {
-                        "token_class": AuthToken.__name__,
-                        "token_type": AuthToken.token_type,
-                        "message": e.args[0],
-                    }
-                )
-        if messages:
-            raise AuthenticationFailed(messages, code="token_invalid")
+        payload, errors = verify_token(raw_token)
+        return self._check_context(TokenContext(raw_token, payload, errors))
+
+    def _check_context(self, context):
+        if context.is_valid:
+            return True
+        if context.errors:
+            raise AuthenticationFailed(context.errors, code="token_invalid")
         else:
             raise AuthenticationFailed("Invalid token", code="invalid_token")
 
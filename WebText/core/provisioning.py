@@ -0,0 +1,128 @@
+"""
+This file is used to define the bulk account provisioning for the game
+
+HOW TO:
+1. Build the account rows, e.g. `[{"username": "student1"}, ...]`
+2. Call `provision_users(model, rows)`, or run `manage.py provision_users`
+
+This File Does:
+
+1. Defines the hash_passwords function, hashing in a process pool
+2. Defines the check_usernames function
+3. Defines the provision_users function
+
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from core.conf import core_setting
+from core.utils import PasswordGenerator, chunked
+
+
+def _setup_worker(settings_module):
+    # spawned workers start without Django, forked ones already have it
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def hash_passwords(passwords, workers=None, chunk_size=200):
+    """Hash `passwords` with the configured PASSWORD_HASHERS, spread
+    over `workers` processes. Returns the hashes in the same order."""
+    chunks = list(chunked(passwords, chunk_size))
+    if workers == 1 or len(chunks) <= 1:
+        return [hashed for chunk in chunks for hashed in _hash_chunk(chunk)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_setup_worker,
+        initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", ""),),
+    ) as executor:
+        return [hashed for hashes in executor.map(_hash_chunk, chunks) for hashed in hashes]
+
+
+def check_usernames(rows, username_field):
+    """Split `rows` into the ones that can be created and
+    `{"index": ..., "errors": [...]}` reports for the rows without a
+    username or repeating the one of an earlier row."""
+    valid, errors, first_index = [], [], {}
+    for index, row in enumerate(rows):
+        username = row.get(username_field)
+        if not username:
+            errors.append({"index": index, "errors": [f"{username_field} is required."]})
+        elif username in first_index:
+            errors.append(
+                {
+                    "index": index,
+                    "errors": [
+                        f"{username_field} {username!r} is already used by row "
+                        f"{first_index[username]}."
+                    ],
+                }
+            )
+        else:
+            first_index[username] = index
+            valid.append(row)
+    return valid, errors
+
+
+def provision_users(
+    model,
+    rows,
+    password_length=12,
+    workers=None,
+    batch_size=None,
+    skip_existing=True,
+):
+    """Create one `model` user per row with a generated password.
+
+    Each row is a dict of model field values holding at least
+    `model.USERNAME_FIELD`; keys that are not fields of `model` are
+    ignored. Rows whose username already exists are skipped when
+    `skip_existing` is set. Rows without a username, or repeating the
+    username of an earlier row, are reported before any password is
+    hashed. Returns `(created, skipped, errors)`, `created` being
+    `(username, plain password)` pairs to hand out and `errors`
+    `{"index": ..., "errors": [...]}` reports of the rejected rows.
+    """
+    username_field = model.USERNAME_FIELD
+    batch_size = batch_size or core_setting("BULK_BATCH_SIZE")
+    field_names = {field.name for field in model._meta.concrete_fields}
+
+    rows, errors = check_usernames(rows, username_field)
+    skipped = []
+    if skip_existing:
+        existing = set()
+        for batch in chunked([row[username_field] for row in rows], batch_size):
+            existing.update(
+                model._default_manager.filter(**{f"{username_field}__in": batch}).values_list(
+                    username_field, flat=True
+                )
+            )
+        skipped = [row[username_field] for row in rows if row[username_field] in existing]
+        rows = [row for row in rows if row[username_field] not in existing]
+
+    passwords = PasswordGenerator.generate_many(len(rows), password_length)
+    hashes = hash_passwords(passwords, workers=workers)
+    users = [
+        model(
+            **{
+                key: value
+                for key, value in row.items()
+                if key in field_names and key != "password"
+            },
+            password=hashed,
+        )
+        for row, hashed in zip(rows, hashes)
+    ]
+    with transaction.atomic():
+        model._default_manager.bulk_create(users, batch_size=batch_size)
+    created = [(row[username_field], password) for row, password in zip(rows, passwords)]
+    return created, skipped, errors
@@ -0,0 +1,130 @@
+"""
+This file is used to define the queryset planning for the game
+
+HOW TO:
+1. Call `build_query_plan(serializer_class, model)` once per view class
+2. Apply the result with `apply_query_plan(queryset, plan)`
+
+This File Does:
+
+1. Defines the QueryPlan namedtuple
+2. Defines the build_query_plan function
+3. Defines the apply_query_plan function
+
+"""
+
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+# select_related: forward foreign keys / one-to-ones the serializer follows
+# prefetch_related: reverse and many-to-many relations it follows
+# only: the columns it renders, None when they can't all be known
+QueryPlan = namedtuple("QueryPlan", ["select_related", "prefetch_related", "only"])
+
+
+def _nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _is_forward(model_field):
+    return model_field.concrete and (model_field.many_to_one or model_field.one_to_one)
+
+
+def _is_pk_only(field):
+    """True when `field` renders from the foreign key column alone."""
+    return (
+        isinstance(field, RelatedField)
+        and not isinstance(field, ManyRelatedField)
+        and field.use_pk_only_optimization()
+        and len(field.source_attrs) == 1
+    )
+
+
+class _Planner:
+    def __init__(self):
+        self.select_related = []
+        self.prefetch_related = []
+        self.only = []
+        self.columns_known = True
+
+    def walk(self, serializer, model, prefix="", prefetched=False):
+        """Walk the readable fields of `serializer` rendered from `model`.
+        `prefix` is the lookup path from the root model, `prefetched` is
+        True below a prefetch_related lookup, where only deeper
+        relations matter."""
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            nested = _nested_serializer(field)
+            if field.source == "*":
+                if nested is not None:
+                    self.walk(nested, model, prefix, prefetched)
+                elif not prefetched:
+                    # SerializerMethodField & co. may read any column
+                    self.columns_known = False
+                continue
+
+            name = field.source_attrs[0]
+            try:
+                model_field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                if not prefetched:
+                    # a property or method, its columns are unknown
+                    self.columns_known = False
+                continue
+
+            path = f"{prefix}{name}"
+            if not model_field.is_relation:
+                if not prefetched:
+                    self.only.append(path)
+            elif _is_forward(model_field) and not prefetched:
+                self.walk_forward(field, nested, model_field, path)
+            elif _is_forward(model_field) and _is_pk_only(field):
+                continue
+            else:
+                self.prefetch_related.append(path)
+                if nested is not None:
+                    self.walk(nested, model_field.related_model, f"{path}__", True)
+
+    def walk_forward(self, field, nested, model_field, path):
+        self.only.append(path)
+        if _is_pk_only(field):
+            # no join needed
+            return
+        self.select_related.append(path)
+        if nested is not None:
+            self.walk(nested, model_field.related_model, f"{path}__")
+        # otherwise only() naming just `path` keeps every related column
+
+
+def build_query_plan(serializer_class, model):
+    """Derive the QueryPlan that renders `serializer_class` from `model`
+    without N+1 queries and without loading unused columns."""
+    planner = _Planner()
+    planner.walk(serializer_class(), model)
+    only = None
+    if planner.columns_known:
+        only = tuple(dict.fromkeys(planner.only))
+    return QueryPlan(
+        select_related=tuple(dict.fromkeys(planner.select_related)),
+        prefetch_related=tuple(dict.fromkeys(planner.prefetch_related)),
+        only=only,
+    )
+
+
+def apply_query_plan(queryset, plan):
+    if plan.select_related:
+        queryset = queryset.select_related(*plan.select_related)
+    if plan.prefetch_related:
+        queryset = queryset.prefetch_related(*plan.prefetch_related)
+    if plan.only:
+        queryset = queryset.only(*plan.only)
+    return queryset
@@ -0,0 +1,130 @@
+"""
+This file is used to define the user lookup registry for the game
+
+HOW TO:
+1. Register every user model with `user_registry.register(user_type, model)`
+2. Resolve one user with `user_registry.get(user_type, user_id)`, or
+   `await user_registry.aget(user_type, user_id)` from async code
+3. Resolve many users with `user_registry.get_many(pairs)`
+4. Watch the registered models with `user_registry.connect(receiver)`
+
+This File Does:
+
+1. Defines the UserLookup class
+2. Defines the UserRegistry class
+
+"""
+
+from collections import defaultdict
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+
+class UserLookup:
+    """How to load the users of one `user_type`.
+
+    `model` may be a model class or an "app_label.ModelName" string, the
+    latter is only resolved on first use. `only` limits the columns that
+    are loaded and `select_related` joins the relations auth needs.
+    """
+
+    def __init__(self, model, only=(), select_related=()):
+        self._model = model
+        self.select_related = tuple(select_related)
+        # deferring a field that is traversed by select_related is an error
+        self.only = tuple(dict.fromkeys((*only, *self.select_related))) if only else ()
+
+    @property
+    def label(self):
+        if isinstance(self._model, str):
+            return self._model.lower()
+        return self._model._meta.label_lower
+
+    @property
+    def model(self):
+        if isinstance(self._model, str):
+            self._model = apps.get_model(self._model)
+        return self._model
+
+    def connect(self, receiver):
+        """Connect `receiver` to post_save / post_delete of this model
+        only. A string is resolved by Django once the model is loaded,
+        models of apps that aren't installed have no rows to watch."""
+        if isinstance(self._model, str):
+            try:
+                apps.get_app_config(self.label.partition(".")[0])
+            except LookupError:
+                return
+        for signal in (post_save, post_delete):
+            signal.connect(receiver, sender=self._model)
+
+    def get_queryset(self):
+        queryset = self.model._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+class UserRegistry:
+    """Maps a token's `user_type` claim to the model holding that user."""
+
+    def __init__(self):
+        self._lookups = {}
+        self._receivers = []
+
+    def register(self, user_type, model, only=(), select_related=()):
+        lookup = self._lookups[user_type] = UserLookup(model, only, select_related)
+        for receiver in self._receivers:
+            lookup.connect(receiver)
+
+    def connect(self, receiver):
+        """Call `receiver(sender, instance, **kwargs)` whenever a row of a
+        registered user model, including ones registered later, is saved
+        or deleted."""
+        self._receivers.append(receiver)
+        for lookup in self._lookups.values():
+            lookup.connect(receiver)
+
+    def get_lookup(self, user_type):
+        try:
+            return self._lookups[user_type]
+        except KeyError:
+            raise LookupError(f"Unknown user type {user_type!r}")
+
+    def get_user_type(self, model):
+        """Return the user_type registered for `model`, or None."""
+        label = model._meta.label_lower
+        for user_type, lookup in self._lookups.items():
+            if lookup.label == label:
+                return user_type
+        return None
+
+    def get(self, user_type, user_id):
+        """Load a single user with one query."""
+        return self.get_lookup(user_type).get_queryset().get(pk=user_id)
+
+    async def aget(self, user_type, user_id):
+        """Async version of get."""
+        return await self.get_lookup(user_type).get_queryset().aget(pk=user_id)
+
+    def get_many(self, pairs):
+        """Load every `(user_type, user_id)` pair with one query per
+        user_type. Returns a dict keyed by the given pairs, users that
+        do not exist are left out."""
+        ids_by_type = defaultdict(set)
+        for user_type, user_id in pairs:
+            ids_by_type[user_type].add(user_id)
+
+        users = {}
+        for user_type, user_ids in ids_by_type.items():
+            lookup = self.get_lookup(user_type)
+            pk_field = lookup.model._meta.pk
+            found = lookup.get_queryset().in_bulk(user_ids)
+            for user_id in user_ids:
+                user = found.get(pk_field.to_python(user_id))
+                if user is not None:
+                    users[(user_type, user_id)] = user
+        return users
@@ -0,0 +1,233 @@
+"""
+This file is used to define the read / write database routing for the game
+
+HOW TO:
+1. Add the replica aliases to DATABASES and list them in CORE["READ_DATABASES"]
+2. Keep "core.routers.ReadWriteRouter" in DATABASE_ROUTERS
+3. Point CORE["READ_STICKY_CACHE"] to a cache every worker shares, e.g. Redis
+   or the database cache, `manage.py check` warns about a per-process one
+4. CoreViewSet routes its own requests, wrap any other code in
+   `route_request(request, read_only)`
+
+Locally a replica can be a copy of db.sqlite3, e.g.
+`"replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": BASE_DIR / "replica.sqlite3"}`.
+
+This File Does:
+
+1. Defines the route_request context manager
+2. Defines the client stickiness after writes, and the check of its cache
+3. Defines the ReplicaPool class and its health checks
+4. Defines the ReadWriteRouter class
+
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from core.conf import core_setting
+from core.tokens import get_token_context
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# True while the current request may read from a replica
+read_from_replica = ContextVar("read_from_replica", default=False)
+
+
+def get_client_key(request):
+    """Who wrote: the token's user, else the session cookie, else the IP.
+    Neither the session nor the user is loaded."""
+    payload = get_token_context(request).payload
+    if payload is not None:
+        return f"user:{payload.get('user_type')}:{payload.get('user_id')}"
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key:
+        return f"session:{session_key}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+# backends that live in one process, the next request may hit another worker
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def get_sticky_cache():
+    return caches[core_setting("READ_STICKY_CACHE")]
+
+
+def get_sticky_cache_key(client_key):
+    return f"core.routers.sticky:{client_key}"
+
+
+def mark_sticky(client_key):
+    """Send the reads of `client_key` to the primary for the next
+    READ_STICKY_SECONDS, so it reads its own writes."""
+    timeout = core_setting("READ_STICKY_SECONDS")
+    if timeout:
+        get_sticky_cache().set(get_sticky_cache_key(client_key), True, timeout)
+
+
+def is_sticky(client_key):
+    return get_sticky_cache().get(get_sticky_cache_key(client_key), False)
+
+
+def check_sticky_cache(app_configs=None, **kwargs):
+    """Warn when replicas are read but the stickiness isn't shared."""
+    if not core_setting("READ_DATABASES") or not core_setting("READ_STICKY_SECONDS"):
+        return []
+    alias = core_setting("READ_STICKY_CACHE")
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend is None:
+        return [
+            checks.Error(
+                f'CORE["READ_STICKY_CACHE"] is {alias!r}, which is not in CACHES.',
+                id="core.E001",
+            )
+        ]
+    if backend in LOCAL_CACHE_BACKENDS:
+        return [
+            checks.Warning(
+                f'CORE["READ_STICKY_CACHE"] uses {backend}, which is not shared '
+                "between workers.",
+                hint="Clients only read their own writes while they hit the same "
+                "worker, use a shared cache such as Redis or the database cache.",
+                id="core.W001",
+            )
+        ]
+    return []
+
+
+@contextmanager
+def route_request(request, read_only):
+    """Let the queries run inside go to a replica when `read_only` and
+    the client hasn't written recently. Unsafe requests make the client
+    sticky once they are done."""
+    if not replicas.aliases:
+        yield
+        return
+
+    client_key = get_client_key(request)
+    token = read_from_replica.set(read_only and not is_sticky(client_key))
+    try:
+        yield
+    finally:
+        read_from_replica.reset(token)
+        if request.method not in SAFE_METHODS:
+            mark_sticky(client_key)
+
+
+class ReplicaPool:
+    """The replica aliases of CORE["READ_DATABASES"] that are reachable
+    and no more than REPLICA_MAX_LAG seconds behind.
+
+    Health is checked at most every REPLICA_CHECK_INTERVAL seconds, by
+    the first request that needs a replica after the interval.
+    """
+
+    # seconds the replica is behind, NULL when it is not replaying
+    lag_queries = {
+        "postgresql": "SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())",
+    }
+
+    def __init__(self, aliases=None):
+        self._aliases = aliases
+        self.healthy = []
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def aliases(self):
+        if self._aliases is not None:
+            return self._aliases
+        return core_setting("READ_DATABASES")
+
+    def get_lag(self, alias):
+        """Seconds `alias` is behind the primary, None when unknown.
+        Raises DatabaseError when the replica can't be reached."""
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute("SHOW REPLICA STATUS")
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                columns = [column[0] for column in cursor.description]
+                lag = dict(zip(columns, row)).get("Seconds_Behind_Source")
+            elif connection.vendor in self.lag_queries:
+                cursor.execute(self.lag_queries[connection.vendor])
+                lag = cursor.fetchone()[0]
+            else:
+                # e.g. SQLite copies, only check that they answer
+                cursor.execute("SELECT 1")
+                lag = None
+        return None if lag is None else float(lag)
+
+    def is_healthy(self, alias):
+        try:
+            lag = self.get_lag(alias)
+        except DatabaseError:
+            return False
+        return lag is None or lag <= core_setting("REPLICA_MAX_LAG")
+
+    def check_health(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        # one request checks, the others keep using the last result
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + core_setting("REPLICA_CHECK_INTERVAL")
+            self.healthy = [alias for alias in self.aliases if self.is_healthy(alias)]
+        finally:
+            self._lock.release()
+
+    def choose(self):
+        """A healthy replica alias, or None to read from the primary."""
+        self.check_health()
+        healthy = self.healthy
+        if not healthy:
+            return None
+        return random.choice(healthy)
+
+
+replicas = ReplicaPool()
+
+
+class ReadWriteRouter:
+    """Reads go to a replica inside `route_request(..., read_only=True)`,
+    everything else, writes included, goes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if not read_from_replica.get():
+            return None
+        # reads inside a transaction must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return replicas.choose()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *replicas.aliases}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from the primary
+        if db in replicas.aliases:
+            return False
+        return None
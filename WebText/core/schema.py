@@ -0,0 +1,182 @@
+"""
+This file is used to define the cached OpenAPI schema of the game
+
+HOW TO:
+1. Make a SchemaCache with the openapi.Info fields of the API, e.g.
+   `SchemaCache(title="CODERA API", default_version="v1")`
+2. Route `schema_cache.as_view()` with a `format` kwarg of ".json" or ".yaml"
+3. Route `schema_cache.as_ui_view("swagger")` / `("redoc")` when drf_yasg is installed
+4. Optionally run `python manage.py build_schema` at deploy time, it writes
+   the rendered files to CORE["SCHEMA_DIR"] and every process serves them
+   without introspecting the views
+
+This File Does:
+
+1. Defines the RenderedSchema namedtuple
+2. Defines the SchemaCache class, rendering the schema once per process
+   or loading it from CORE["SCHEMA_DIR"]
+3. Serves the rendered bytes with an ETag and answers If-None-Match with 304
+4. Imports drf_yasg only when a schema is rendered or a UI page is served,
+   so serving the `build_schema` files doesn't load it
+
+"""
+
+import hashlib
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_safe
+
+from core.conf import core_setting
+
+
+RenderedSchema = namedtuple("RenderedSchema", ["content", "content_type", "etag"])
+
+# format kwarg of the url: (drf_yasg renderer, content type, file name in SCHEMA_DIR)
+FORMATS = {
+    ".json": ("drf_yasg.renderers.SwaggerJSONRenderer", "application/json", "schema.json"),
+    ".yaml": ("drf_yasg.renderers.SwaggerYAMLRenderer", "application/yaml", "schema.yaml"),
+}
+
+
+def get_etag(content):
+    return quote_etag(hashlib.sha1(content).hexdigest())
+
+
+class SchemaCache:
+    """The rendered JSON and YAML of one API schema.
+
+    The schema only changes with the code, so it is generated once per
+    process and base url, on the first request, and kept until the next
+    deploy restarts the workers. When CORE["SCHEMA_DIR"] holds the files
+    written by `build_schema` they are served instead.
+    """
+
+    def __init__(self, url=None, public=True, generator_class=None, validators=None, **info):
+        self.info = info
+        self.url = url
+        self.public = public
+        self.generator_class = generator_class
+        self.validators = validators or []
+        # base url (or "" for the files) -> {format: RenderedSchema}
+        self.rendered = {}
+        self.ui_views = {}
+        self._lock = threading.Lock()
+
+    def get_info(self):
+        from drf_yasg import openapi
+
+        return openapi.Info(**self.info)
+
+    def get_generator_class(self):
+        if self.generator_class is not None:
+            return self.generator_class
+        from drf_yasg.app_settings import swagger_settings
+
+        return swagger_settings.DEFAULT_GENERATOR_CLASS
+
+    def get_url(self, request=None):
+        """The scheme and host written in the schema: the `url` given,
+        else CORE["SCHEMA_URL"], else the one of `request`."""
+        url = self.url or core_setting("SCHEMA_URL")
+        if url is None and request is not None:
+            # scheme and host only, a path would be ignored with a warning
+            url = request.build_absolute_uri("/").rstrip("/")
+        return url
+
+    def render(self, url=None):
+        """Introspect the API and render the schema in every format."""
+        generator = self.get_generator_class()(self.get_info(), "", url)
+        # public schemas are the same for everyone, no request is needed
+        schema = generator.get_schema(None, self.public)
+        rendered = {}
+        for format, (renderer_path, content_type, _) in FORMATS.items():
+            renderer = import_string(renderer_path).with_validators(self.validators)()
+            content = renderer.render(schema)
+            rendered[format] = RenderedSchema(content, content_type, get_etag(content))
+        return rendered
+
+    def load(self, directory):
+        """The rendered schema written to `directory`, None when a file
+        is missing."""
+        rendered = {}
+        for format, (_, content_type, file_name) in FORMATS.items():
+            path = Path(directory) / file_name
+            if not path.exists():
+                return None
+            content = path.read_bytes()
+            rendered[format] = RenderedSchema(content, content_type, get_etag(content))
+        return rendered
+
+    def write(self, directory, url=None):
+        """Render the schema and write it to `directory` for `load`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        rendered = self.render(url)
+        for format, (_, _, file_name) in FORMATS.items():
+            (directory / file_name).write_bytes(rendered[format].content)
+        return [directory / file_name for _, _, file_name in FORMATS.values()]
+
+    def get(self, request, format):
+        directory = core_setting("SCHEMA_DIR")
+        key = "" if directory else self.get_url(request)
+        rendered = self.rendered.get(key)
+        if rendered is None:
+            # the first requests wait for one render instead of each doing it
+            with self._lock:
+                rendered = self.rendered.get(key)
+                if rendered is None and directory:
+                    rendered = self.load(directory)
+                if rendered is None:
+                    rendered = self.render(self.get_url(request))
+                self.rendered[key] = rendered
+        return rendered[format]
+
+    def clear(self):
+        self.rendered = {}
+
+    def as_view(self):
+        @require_safe
+        def view(request, format=".json"):
+            if format not in FORMATS:
+                raise Http404(f"Unknown schema format {format!r}")
+            schema = self.get(request, format)
+            response = get_conditional_response(request, etag=schema.etag)
+            if response is None:
+                response = HttpResponse(schema.content, content_type=schema.content_type)
+                response["ETag"] = schema.etag
+            # clients may keep it but have to revalidate, a 304 is cheap
+            patch_cache_control(response, public=True, no_cache=True)
+            return response
+
+        view.schema_cache = self
+        return view
+
+    def get_ui_view(self, renderer):
+        if renderer not in self.ui_views:
+            from drf_yasg.views import get_schema_view
+            from rest_framework.permissions import AllowAny
+
+            schema_view = get_schema_view(
+                self.get_info(),
+                url=self.url,
+                public=self.public,
+                generator_class=self.get_generator_class(),
+                permission_classes=(AllowAny,),
+            )
+            # the page loads its spec from SWAGGER_SETTINGS / REDOC_SETTINGS["SPEC_URL"]
+            self.ui_views[renderer] = schema_view.with_ui(renderer, cache_timeout=0)
+        return self.ui_views[renderer]
+
+    def as_ui_view(self, renderer="swagger"):
+        """The drf_yasg swagger / redoc page, built on its first request."""
+
+        def view(request, *args, **kwargs):
+            return self.get_ui_view(renderer)(request, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
@@ -1,9 +1,172 @@
+import logging
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DatabaseError, models, transaction
+from django.utils import timezone
 from rest_framework import serializers, exceptions
+from rest_framework.relations import RelatedField
+
+from core.conf import core_setting
+from core.utils import chunked
+
+
+logger = logging.getLogger(__name__)
+
+
+# What CoreSerializer needs to know about its model to write it, built once
+# per serializer class by CoreSerializer.get_field_plan().
+#   writable:   ((field name, default factory), ...) in model field order
+#   updateable: frozenset of Meta.updateable_fields, or None when not set
+#   concrete:   frozenset of every concrete field name of the model
+#   relations:  {field name: attname} of the concrete foreign keys
+FieldPlan = namedtuple("FieldPlan", ["writable", "updateable", "concrete", "relations"])
+
+# How CoreReadOnlySerializer renders values() rows without model instances,
+# built once per serializer class by get_compiled_representation().
+#   sources:   the model columns to select with values()
+#   represent: function turning one values() row into the output dict
+CompiledRepresentation = namedtuple("CompiledRepresentation", ["sources", "represent"])
+
+# serializer fields whose to_representation returns model values of these
+# types unchanged, so the compiled function copies them as they are
+PASSTHROUGH_FIELDS = {
+    serializers.ReadOnlyField: models.Field,
+    serializers.IntegerField: (models.IntegerField, models.AutoField),
+    serializers.CharField: (models.CharField, models.TextField),
+    serializers.BooleanField: models.BooleanField,
+}
+
+
+class CoreListSerializer(serializers.ListSerializer):
+    """List serializer used by every CoreSerializer with `many=True`.
+
+    Writes go through `bulk_create` / `bulk_update` in batches, every
+    batch in its own transaction, and failures are reported per item
+    instead of failing the whole list. Database errors are logged, the
+    items only get WRITE_ERROR.
+    """
+
+    WRITE_ERROR = "Could not be saved."
+
+    def validate_items(self, items):
+        """Validate every item on its own. Returns `(valid, errors)`, where
+        `valid` holds `(index, validated_data)` pairs and `errors` holds
+        `{"index": ..., "errors": ...}` reports."""
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, self.run_child_validation(item)))
+            except serializers.ValidationError as exc:
+                errors.append({"index": index, "errors": exc.detail})
+        return valid, errors
+
+    def write_batch(self, batch, write):
+        """Run `write(objs)` on the objects of the `(index, obj)` pairs in
+        one transaction. When it fails, each object is written again in
+        its own, so only the failing ones are reported. Returns
+        `(written, errors)`."""
+        try:
+            with transaction.atomic():
+                write([obj for _, obj in batch])
+        except DatabaseError:
+            logger.exception("Writing a batch of %d rows failed", len(batch))
+        else:
+            return [obj for _, obj in batch], []
+
+        written, errors = [], []
+        for index, obj in batch:
+            try:
+                with transaction.atomic():
+                    write([obj])
+            except DatabaseError as exc:
+                logger.warning("Writing item %d failed: %s", index, exc)
+                errors.append({"index": index, "errors": [self.WRITE_ERROR]})
+            else:
+                written.append(obj)
+        return written, errors
+
+    def bulk_create(self, items, batch_size):
+        """Insert `(index, validated_data)` pairs, `batch_size` rows per
+        transaction. Returns `(created, errors)`."""
+        model = self.child.get_model()
+        created, errors = [], []
+        for batch in chunked(items, batch_size):
+            written, failed = self.write_batch(
+                [(index, self.child.build_instance(data)) for index, data in batch],
+                lambda objs: model.objects.bulk_create(objs, batch_size=batch_size),
+            )
+            created.extend(written)
+            errors.extend(failed)
+        return created, errors
+
+    def bulk_update(self, items, batch_size, queryset=None):
+        """Update `(index, pk, validated_data)` triples, `batch_size` rows
+        per transaction, `pk` being already converted with the primary
+        key's to_python. Only rows of `queryset` are updated, the others
+        are reported as not found. Returns `(updated, errors)`."""
+        model = self.child.get_model()
+        if queryset is None:
+            queryset = model._default_manager.all()
+        updated, errors = [], []
+        for batch in chunked(items, batch_size):
+            instances = queryset.in_bulk([pk for _, pk, _ in batch])
+            objs, fields = [], set()
+            for index, pk, data in batch:
+                instance = instances.get(pk)
+                if instance is None:
+                    errors.append({"index": index, "errors": ["Not found."]})
+                    continue
+                changed = self.child.apply_changes(instance, data)
+                if changed:
+                    fields.update(changed)
+                    objs.append((index, instance))
+                else:
+                    # nothing differs, there is no row to rewrite
+                    updated.append(instance)
+            fields = [field for field in fields if self.child.has_model_field(field)]
+            if not objs or not fields:
+                updated.extend(instance for _, instance in objs)
+                continue
+            if self.child.has_model_field("updated_at"):
+                now = timezone.now()
+                for _, instance in objs:
+                    instance.updated_at = now
+                fields.append("updated_at")
+            written, failed = self.write_batch(
+                objs,
+                lambda instances: model.objects.bulk_update(
+                    instances, fields, batch_size=batch_size
+                ),
+            )
+            updated.extend(written)
+            errors.extend(failed)
+        return updated, errors
+
+    def create(self, validated_data):
+        """`serializer.save()` with `many=True` inserts every item, all or
+        nothing. A database error is a ValidationError listing the items
+        that failed."""
+        batch_size = core_setting("BULK_BATCH_SIZE")
+        with transaction.atomic():
+            created, errors = self.bulk_create(list(enumerate(validated_data)), batch_size)
+            if errors:
+                # leaving the block with the error rolls the other rows back
+                raise serializers.ValidationError(errors)
+        return created
 
 
 class CoreSerializer(serializers.Serializer):
     id = serializers.IntegerField(required=False, read_only=True)
 
+    def __init_subclass__(cls, **kwargs):
+        """Make `many=True` use CoreListSerializer unless the subclass
+        names its own `Meta.list_serializer_class`."""
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, "Meta", None)
+        if meta is not None and not hasattr(meta, "list_serializer_class"):
+            meta.list_serializer_class = CoreListSerializer
+
     @classmethod
     def get_model(cls):
         """This method returns the Django model associated
@@ -29,38 +192,136 @@ class CoreSerializer(serializers.Serializer):
         field in the associated model."""
         return cls.get_model()._meta.get_field(field_name).get_default()  # type: ignore
 
+    @classmethod
+    def get_field_plan(cls):
+        """This method returns the FieldPlan of this serializer class.
+        It is built on first use and then reused by every instance."""
+        plan = cls.__dict__.get("_field_plan")
+        if plan is None:
+            plan = cls.build_field_plan()
+            cls._field_plan = plan
+        return plan
+
+    @classmethod
+    def build_field_plan(cls):
+        """This method walks the model fields once, keeping the ones
+        listed in Meta.fields together with their default factory."""
+        model_fields = cls.get_model_fields()
+        declared = set(cls.Meta.fields)
+        updateable = None
+        if hasattr(cls.Meta, "updateable_fields"):
+            updateable = frozenset(cls.get_updateable_fields())
+        return FieldPlan(
+            writable=tuple(
+                (field.name, field.get_default)
+                for field in model_fields
+                if field.name in declared
+            ),
+            updateable=updateable,
+            concrete=frozenset(field.name for field in model_fields),
+            relations={
+                field.name: field.attname
+                for field in model_fields
+                if field.is_relation
+            },
+        )
+
+    @classmethod
+    def has_model_field(cls, field_name):
+        """This method returns True if the associated model
+        has a concrete field called `field_name`."""
+        return field_name in cls.get_field_plan().concrete
+
+    def get_create_kwargs(self, validated_data: dict):
+        """This method takes every writable field of the field plan
+        from validated_data, falling back to the field's default
+        value when it's not provided."""
+        return {
+            name: validated_data[name] if name in validated_data else get_default()
+            for name, get_default in self.get_field_plan().writable
+        }
+
+    def get_update_data(self, validated_data: dict):
+        """This method returns the part of validated_data an update
+        may write, limited to Meta.updateable_fields when it is set."""
+        updateable = self.get_field_plan().updateable
+        if updateable is not None:
+            return {
+                key: value
+                for key, value in validated_data.items()
+                if key in updateable
+            }
+        return dict(validated_data)
+
+    def build_instance(self, validated_data: dict):
+        """This method returns a new, unsaved object built from
+        validated_data, used by bulk creates."""
+        return self.get_model()(**self.get_create_kwargs(validated_data))  # type: ignore
+
     def create(self, validated_data: dict):
         """When creating a new object, this method is called.
-        It iterates over all fields in the model, checks if the field
-        is in the Meta.fields list, and adds it to the validated_data
-        dictionary with its default value if it's not provided.
-        Then, it creates a new object using the validated_data
-        dictionary."""
+        It fills in the defaults with get_create_kwargs and then
+        creates a new object using the resulting dictionary."""
+        if isinstance(validated_data, dict):
+            return self.get_model().objects.create(  # type: ignore
+                **self.get_create_kwargs(validated_data)
+            )
+
+    async def acreate(self, validated_data: dict):
+        """Async version of create, used by AsyncCoreViewSet."""
         if isinstance(validated_data, dict):
-            new_validated_data = {}
-            for field in self.get_model_fields():
-                if field.name in self.Meta.fields:
-                    new_validated_data[f"{field.name}"] = validated_data.get(
-                        field.name, self.get_field_defaults(field.name)
-                    )
-            return self.get_model().objects.create(**new_validated_data)  # type: ignore
+            return await self.get_model().objects.acreate(  # type: ignore
+                **self.get_create_kwargs(validated_data)
+            )
+
+    def apply_changes(self, instance, validated_data):
+        """This method sets every value of get_update_data that differs
+        from the instance and returns the names of the changed fields.
+        Foreign keys are compared by id, and deferred fields count as
+        changed so they are not loaded just to be compared."""
+        plan = self.get_field_plan()
+        deferred = instance.get_deferred_fields()
+        changed = []
+        for key, value in self.get_update_data(validated_data).items():
+            if key in deferred:
+                pass
+            elif key in plan.relations:
+                current = getattr(instance, plan.relations[key])
+                if current == getattr(value, "pk", value):
+                    continue
+            elif getattr(instance, key, None) == value:
+                continue
+            setattr(instance, key, value)
+            changed.append(key)
+        return changed
+
+    def get_update_fields(self, changed):
+        """This method returns the update_fields for saving `changed`,
+        plus updated_at, or None when a changed name is not a concrete
+        model field and the whole row has to be saved."""
+        plan = self.get_field_plan()
+        if any(name not in plan.concrete for name in changed):
+            return None
+        if "updated_at" in plan.concrete:
+            return [*changed, "updated_at"]
+        return list(changed)
 
     def update(self, instance, validated_data):
         """When updating an object, this method is called.
-        It iterates over all fields in the model, checks if the field
-        is in the Meta.fields list, and updates the instance with the
-        new value if it's provided in the validated_data dictionary.
-        Then, it saves the instance."""
-        if hasattr(self.Meta, "updateable_fields"):
-            for key, value in validated_data.items():
-                setattr(instance, key, value)
-            instance.save()
-            return instance
-        else:
-            for key, value in validated_data.items():
-                setattr(instance, key, value)
-            instance.save()
-            return instance
+        It applies the values that differ from the instance, limited to
+        Meta.updateable_fields when it is set, and saves only those
+        columns. When nothing changed the instance is not saved."""
+        changed = self.apply_changes(instance, validated_data)
+        if changed:
+            instance.save(update_fields=self.get_update_fields(changed))
+        return instance
+
+    async def aupdate(self, instance, validated_data):
+        """Async version of update, used by AsyncCoreViewSet."""
+        changed = self.apply_changes(instance, validated_data)
+        if changed:
+            await instance.asave(update_fields=self.get_update_fields(changed))
+        return instance
 
     @classmethod
     def get_object_instance(cls, instance):
@@ -80,9 +341,63 @@ class CoreReadOnlySerializer(CoreSerializer):
         This means that all fields in the serializer are read-only and
         are not required."""
         super().__init__(*args, **kwargs)
-        for key in self.get_fields():
-            self.fields[key].read_only = True
-            self.fields[key].required = False
+        for field in self.fields.values():
+            field.read_only = True
+            field.required = False
+
+    @classmethod
+    def get_compiled_representation(cls):
+        """This method returns the CompiledRepresentation of this
+        serializer class, or None when it can't be compiled. It is
+        built on first use and then reused by every instance."""
+        if "_compiled_representation" not in cls.__dict__:
+            cls._compiled_representation = cls.compile_representation()
+        return cls._compiled_representation
+
+    @classmethod
+    def compile_representation(cls):
+        """This method generates a function that renders a values() row
+        the same way to_representation renders an instance. Only
+        serializers whose readable fields are plain, non-relational
+        model columns can be compiled, anything else returns None."""
+        if cls.to_representation is not serializers.Serializer.to_representation:
+            return None
+        model = cls.get_model()
+        sources, items, namespace = [], [], {}
+        for field in cls().fields.values():
+            if field.write_only:
+                continue
+            if (
+                isinstance(field, (serializers.BaseSerializer, RelatedField))
+                or type(field).get_attribute is not serializers.Field.get_attribute
+                or len(field.source_attrs) != 1
+            ):
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if (
+                not model_field.concrete
+                or model_field.is_relation
+                or isinstance(model_field, models.FileField)
+            ):
+                return None
+
+            value = f"row[{field.source!r}]"
+            if isinstance(model_field, PASSTHROUGH_FIELDS.get(type(field), ())):
+                items.append(f"{field.field_name!r}: {value}")
+            else:
+                converter = f"_convert_{len(namespace)}"
+                namespace[converter] = field.to_representation
+                items.append(
+                    f"{field.field_name!r}: None if {value} is None else {converter}({value})"
+                )
+            sources.append(field.source)
+
+        code = "def represent(row):\n    return {%s}\n" % ", ".join(items)
+        exec(code, namespace)
+        return CompiledRepresentation(tuple(dict.fromkeys(sources)), namespace["represent"])
 
     def update(self, instance, validated_data):
         """This method is called when updating an object.
@@ -99,3 +414,17 @@ class CoreReadOnlySerializer(CoreSerializer):
         raise exceptions.MethodNotAllowed(
             "Method 'create' is not allowed for read-only serializer."
         )
+
+    async def aupdate(self, instance, validated_data):
+        return self.update(instance, validated_data)
+
+    async def acreate(self, validated_data: dict):
+        return self.create(validated_data)
+
+    def build_instance(self, validated_data: dict):
+        """This method is called when bulk creating objects.
+        It raises an exception because the method is not allowed for
+        read-only serializer."""
+        raise exceptions.MethodNotAllowed(
+            "Method 'create' is not allowed for read-only serializer."
+        )
@@ -0,0 +1,242 @@
+"""
+This file is used to define the static and media file serving for the game
+
+HOW TO:
+1. Use "core.static.CompressedManifestStaticFilesStorage" as the "staticfiles"
+   storage and run `python manage.py collectstatic`
+2. Wrap the WSGI application with `StaticFilesHandler(application)`, or the
+   ASGI one with `ASGIStaticFilesHandler(application)`
+3. Files under STATIC_URL are then served from STATIC_ROOT before the
+   middleware runs
+4. Set CORE["SERVE_MEDIA"] to also serve MEDIA_URL from MEDIA_ROOT, it is off
+   by default, uploads are better served by the web server or a CDN
+
+This File Does:
+
+1. Defines the CompressedManifestStaticFilesStorage class, writing a gzip
+   variant next to every compressible collected file
+2. Defines the serve view, picking the variant from Accept-Encoding and
+   streaming it with FileResponse
+3. Marks the hashed names of the staticfiles manifest and the media
+   derivatives immutable, everything else is revalidated
+4. Sets the nosniff header that SecurityMiddleware would, and sandboxes media
+5. Defines the StaticFilesHandler and ASGIStaticFilesHandler wrappers
+
+"""
+
+import gzip
+import mimetypes
+import os
+import posixpath
+import shutil
+import tempfile
+from pathlib import Path
+from urllib.parse import urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.handlers import (
+    ASGIStaticFilesHandler as BaseASGIStaticFilesHandler,
+    StaticFilesHandler as BaseStaticFilesHandler,
+)
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.exception import response_for_exception
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from core.conf import DERIVATIVE_DIR, core_setting
+
+
+# Content-Encoding: suffix of the precompressed file, preferred first
+ENCODINGS = {
+    "gzip": ".gz",
+}
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".map", ".json", ".svg", ".html", ".txt", ".xml",
+    ".ico", ".ttf", ".otf", ".eot", ".wasm",
+}
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# uploads may be HTML or SVG, they must not run scripts on our origin
+MEDIA_HEADERS = {
+    "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; sandbox",
+}
+
+
+def compress_file(path):
+    """Write `path`.gz when it is worth it, return its path or None.
+    Up to date variants are kept."""
+    path = Path(path)
+    if path.suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+        return None
+    stat = path.stat()
+    if stat.st_size < core_setting("STATIC_COMPRESS_MIN_SIZE"):
+        return None
+    compressed = path.with_name(path.name + ENCODINGS["gzip"])
+    if compressed.exists() and compressed.stat().st_mtime >= stat.st_mtime:
+        return compressed
+
+    # written aside and renamed, a worker never serves half a file
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as temporary:
+        with open(path, "rb") as source, gzip.GzipFile(
+            filename="", mode="wb", fileobj=temporary, compresslevel=9, mtime=0
+        ) as target:
+            shutil.copyfileobj(source, target)
+    if os.path.getsize(temporary.name) >= stat.st_size:
+        os.unlink(temporary.name)
+        return None
+    os.replace(temporary.name, compressed)
+    return compressed
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes the gzip variant of
+    the original and the content-hashed copy of every collected file."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in names:
+            if self.exists(name):
+                compress_file(self.path(name))
+
+
+def get_accepted_encodings(request):
+    """The content codings of Accept-Encoding, without the q=0 ones."""
+    accepted = set()
+    for value in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = value.strip().partition(";")
+        params = params.replace(" ", "")
+        if coding and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.lower())
+    return accepted
+
+
+def get_hashed_names():
+    """The content-hashed names of the staticfiles manifest, empty when
+    the storage keeps no manifest or collectstatic hasn't run."""
+    return frozenset(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+
+def is_derivative(path):
+    # named after the content hash of their image, see core.uploads
+    return path.startswith(f"{DERIVATIVE_DIR}/")
+
+
+def serve(request, path, document_root, is_immutable=None, headers=None):
+    """Serve `path` of `document_root`, or its precompressed variant when
+    the client accepts it. Paths `is_immutable` accepts are cached for a
+    year, `headers` are added to every response."""
+    path = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = Path(safe_join(document_root, path))
+    except SuspiciousFileOperation:
+        raise Http404(f"{path} does not exist")
+    if not fullpath.is_file():
+        raise Http404(f"{path} does not exist")
+
+    accepted = get_accepted_encodings(request)
+    encoding = None
+    served = fullpath
+    for coding, suffix in ENCODINGS.items():
+        variant = fullpath.with_name(fullpath.name + suffix)
+        if (coding in accepted or "*" in accepted) and variant.is_file():
+            encoding, served = coding, variant
+            break
+
+    stat = served.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type = mimetypes.guess_type(fullpath.name)[0] or "application/octet-stream"
+        # handed to wsgi.file_wrapper / sendfile, never read into memory here
+        response = FileResponse(
+            served.open("rb"), content_type=content_type, filename=fullpath.name
+        )
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        if encoding:
+            response["Content-Encoding"] = encoding
+
+    patch_vary_headers(response, ("Accept-Encoding",))
+    # answered before SecurityMiddleware, which would set it
+    response["X-Content-Type-Options"] = "nosniff"
+    for header, value in (headers or {}).items():
+        response[header] = value
+    if is_immutable and is_immutable(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+class FilesHandlerMixin:
+    """Serves STATIC_URL from STATIC_ROOT, and MEDIA_URL from MEDIA_ROOT
+    when CORE["SERVE_MEDIA"] is set, requests for other paths go to the
+    wrapped application."""
+
+    def get_roots(self):
+        # read once, the manifest only changes with a deploy
+        hashed_names = get_hashed_names()
+        candidates = [(settings.STATIC_URL, settings.STATIC_ROOT, hashed_names.__contains__, None)]
+        if core_setting("SERVE_MEDIA"):
+            candidates.append(
+                (settings.MEDIA_URL, settings.MEDIA_ROOT, is_derivative, MEDIA_HEADERS)
+            )
+        roots = []
+        for url, root, is_immutable, headers in candidates:
+            url = urlparse(url or "")
+            # files on another host, e.g. a CDN, are not ours to serve
+            if root and url.path and not url.netloc:
+                roots.append((url.path, root, is_immutable, headers))
+        return roots
+
+    def _should_handle(self, path):
+        return any(path.startswith(prefix) for prefix, *_ in self.roots)
+
+    def serve(self, request):
+        for prefix, root, is_immutable, headers in self.roots:
+            if request.path.startswith(prefix):
+                return serve(
+                    request, request.path.removeprefix(prefix), root, is_immutable, headers
+                )
+        raise Http404(f"{request.path} does not exist")
+
+
+class StaticFilesHandler(FilesHandlerMixin, BaseStaticFilesHandler):
+    def __init__(self, application):
+        self.roots = self.get_roots()
+        super().__init__(application)
+
+
+class ASGIStaticFilesHandler(FilesHandlerMixin, BaseASGIStaticFilesHandler):
+    def __init__(self, application):
+        self.roots = self.get_roots()
+        super().__init__(application)
+
+    async def get_response_async(self, request):
+        try:
+            response = await sync_to_async(self.serve, thread_sensitive=False)(request)
+        except Http404 as exc:
+            return await sync_to_async(response_for_exception, thread_sensitive=False)(
+                request, exc
+            )
+        response._resource_closers.append(request.close)
+        if response.streaming and not response.is_async:
+            chunks = iter(response.streaming_content)
+
+            # one block at a time, Django's handler would list() the file
+            async def stream():
+                read = sync_to_async(next, thread_sensitive=False)
+                while (chunk := await read(chunks, None)) is not None:
+                    yield chunk
+
+            response.streaming_content = stream()
+        return response
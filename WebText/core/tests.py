@@ -0,0 +1,1593 @@
+"""
+This file is used to define the tests for the core app
+
+HOW TO:
+1. Run `python manage.py test core`
+2. Put the models a test needs below, core has no migrations so their
+   tables are created with the test database
+
+This File Does:
+
+1. Defines the Player, Guild and Hero test models
+2. Tests every behavior core adds, one TestCase per feature
+
+"""
+
+import csv
+import datetime
+import hashlib
+import importlib
+import io
+import os
+import runpy
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from crispy_forms.utils import render_crispy_form
+from django import forms
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import CommandError, call_command
+from django.core.cache import caches
+from django.core.files.storage import FileSystemStorage
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, connection, models
+from django.db.models import Sum
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, path
+from django.utils.functional import SimpleLazyObject
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+from PIL import Image
+
+from core.api import (
+    AsyncCoreViewSet,
+    AsyncReadOnlyCoreViewSet,
+    CoreViewSet,
+    InstrumentationReportView,
+    ReadOnlyCoreViewSet,
+    response_cache,
+    user_cache,
+    user_registry,
+)
+from core.buckets import bucket_aggregate, bucket_start, iter_bucket_aggregates
+from core.cache import LRUCache
+from core.db import configure_sqlite, get_pragma_statements
+from core.forms import BasicDeleteForm, BasicForm, StaticFragment
+from core.instrumentation import Histogram, QueryCollector, recorder, sql_shape
+from core.management.commands.import_profile import group_by_package, parse_importtime
+from core.middlewares import LoginMiddleware, compile_exempt_paths
+from core.models import BaseModel
+from core.pagination import (
+    EstimatedCountPaginator,
+    decode_cursor,
+    encode_cursor,
+    estimate_count,
+)
+from core.permissions import CustomAuth
+from core.provisioning import provision_users
+from core.queries import build_query_plan
+from core.registry import UserRegistry
+from core.routers import (
+    ReadWriteRouter,
+    ReplicaPool,
+    check_sticky_cache,
+    read_from_replica,
+    route_request,
+)
+from core.schema import SchemaCache
+from core.serializers import CoreReadOnlySerializer, CoreSerializer
+from core.static import StaticFilesHandler, compress_file, serve
+from core.tokens import get_token_context, verified_tokens, verify_token
+from core.uploads import (
+    DerivativeWorkers,
+    HashingFileUploadHandler,
+    content_hashes,
+    get_derivative_path,
+    get_derivative_url_for,
+    make_derivatives,
+    schedule_derivatives,
+)
+from core.utils import PasswordGenerator, get_months_between
+from core.views import BaseDeleteFormView, BaseFormView, BaseListView
+
+
+class Player(models.Model):
+    """User model of the "player" user_type."""
+
+    username = models.CharField(max_length=150, unique=True)
+    email = models.EmailField(blank=True)
+    is_onboarded = models.BooleanField(default=True)
+
+    class Meta:
+        app_label = "core"
+
+
+class Guild(BaseModel):
+    description = models.TextField(blank=True, default="")
+
+    class Meta(BaseModel.Meta):
+        app_label = "core"
+        ordering = ("id",)
+
+
+class Hero(BaseModel):
+    guild = models.ForeignKey(Guild, on_delete=models.CASCADE, related_name="heroes")
+    level = models.IntegerField(default=1)
+
+    class Meta(BaseModel.Meta):
+        app_label = "core"
+        ordering = ("id",)
+
+
+class GuildSerializer(CoreSerializer):
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True)
+
+    class Meta:
+        model = Guild
+        fields = ("name", "description")
+
+
+class HeroSerializer(CoreSerializer):
+    name = serializers.CharField(max_length=255)
+    level = serializers.IntegerField(required=False)
+    guild = serializers.PrimaryKeyRelatedField(queryset=Guild.objects.all())
+
+    class Meta:
+        model = Hero
+        fields = ("name", "level", "guild")
+        updateable_fields = ("name", "level", "guild")
+
+
+class GuildReadOnlySerializer(CoreReadOnlySerializer):
+    name = serializers.CharField()
+    description = serializers.CharField()
+    created_at = serializers.DateTimeField()
+
+    class Meta:
+        model = Guild
+        fields = ("name", "description", "created_at")
+
+
+class GuildReadOnlyViewSet(ReadOnlyCoreViewSet):
+    serializer_class = GuildReadOnlySerializer
+    conditional_get = True
+    # the Authorization header only has to reach the ETag
+    authentication_classes = ()
+
+
+class CachedGuildReadOnlyViewSet(GuildReadOnlyViewSet):
+    cache_responses = True
+
+
+class HeroWithGuildSerializer(CoreReadOnlySerializer):
+    name = serializers.CharField()
+    guild = GuildReadOnlySerializer()
+
+    class Meta:
+        model = Hero
+        fields = ("name", "guild")
+
+
+class HeroWithGuildReadOnlyViewSet(ReadOnlyCoreViewSet):
+    serializer_class = HeroWithGuildSerializer
+    conditional_get = True
+    cache_responses = True
+    authentication_classes = ()
+
+
+class GuildWithHeroesSerializer(CoreReadOnlySerializer):
+    name = serializers.CharField()
+    heroes = HeroSerializer(many=True)
+
+    class Meta:
+        model = Guild
+        fields = ("name", "heroes")
+
+
+class HeroViewSet(CoreViewSet):
+    serializer_class = HeroWithGuildSerializer
+
+
+class GuildForm(BasicForm):
+    name = forms.CharField(max_length=255)
+
+    class Meta:
+        verbose_name = "Guild"
+        model = Guild
+
+
+class GuildDeleteForm(BasicDeleteForm):
+    class Meta:
+        verbose_name = "Delete Guild"
+        model = Guild
+
+
+class GuildFormView(BaseFormView):
+    form_class = GuildForm
+    success_url = "/guilds/"
+
+
+class GuildDeleteFormView(BaseDeleteFormView):
+    form_class = GuildDeleteForm
+    success_url = "/guilds/"
+
+
+class AsyncGuildViewSet(AsyncCoreViewSet):
+    serializer_class = GuildSerializer
+
+
+class AsyncGuildReadOnlyViewSet(AsyncReadOnlyCoreViewSet):
+    serializer_class = GuildReadOnlySerializer
+    conditional_get = True
+    authentication_classes = ()
+
+
+class GuildListView(BaseListView):
+    model = Guild
+    paginate_by = 2
+    keyset_pagination = True
+    row_template_name = "guild_row.html"
+
+
+class GuildViewSet(CoreViewSet):
+    serializer_class = GuildSerializer
+
+
+class ScopedGuildViewSet(GuildViewSet):
+    """Only sees the guilds whose name starts with "open"."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(name__startswith="open")
+
+
+class KeysetGuildViewSet(GuildViewSet):
+    keyset_pagination = True
+
+
+user_registry.register("player", Player)
+
+# ROOT_URLCONF of the tests that go through the middleware
+urlpatterns = [
+    path("guilds/", GuildViewSet.as_view({"get": "list", "post": "create"}), name="guild-list"),
+    path("__instrumentation__/", InstrumentationReportView.as_view()),
+    path("login/", lambda request: HttpResponse(), name="login"),
+    path("async/guilds/", AsyncGuildViewSet.as_view({"get": "list", "post": "create"})),
+    path(
+        "async/guilds/<int:pk>/",
+        AsyncGuildViewSet.as_view(
+            {"get": "retrieve", "patch": "partial_update", "delete": "destroy"}
+        ),
+    ),
+    path("async/read-only/guilds/", AsyncGuildReadOnlyViewSet.as_view({"get": "list"})),
+]
+
+
+def get_token(player):
+    """A signed access token of `player`."""
+    token = AccessToken()
+    token["user_type"] = "player"
+    token["user_id"] = player.pk
+    return str(token)
+
+
+class LRUCacheTestCase(TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_entry_is_missing(self):
+        cache = LRUCache()
+        cache.set("a", 1, timeout=0)
+        self.assertEqual(cache.get("a", "missing"), "missing")
+
+
+class CachedUserTestCase(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.player = Player.objects.create(username="ada")
+        self.decoded = {
+            "user_type": "player",
+            "user_id": self.player.pk,
+            "exp": time.time() + 300,
+        }
+
+    def test_user_is_loaded_once_per_token(self):
+        view = CoreViewSet()
+        with self.assertNumQueries(1):
+            view.get_user(self.decoded)
+        with self.assertNumQueries(0):
+            user = view.get_user(self.decoded)
+        self.assertEqual(user.pk, self.player.pk)
+
+    def test_saving_the_user_drops_it_from_the_cache(self):
+        view = CoreViewSet()
+        view.get_user(self.decoded)
+        self.player.is_onboarded = False
+        self.player.save()
+        with self.assertRaises(PermissionDenied):
+            view.get_user(self.decoded)
+
+    def test_cache_timeout_never_outlives_the_token(self):
+        view = CoreViewSet()
+        self.assertLessEqual(view.get_user_cache_timeout({"exp": time.time() + 5}), 5)
+
+        expired = {**self.decoded, "exp": time.time() - 1}
+        view.get_user(expired)
+        with self.assertNumQueries(1):
+            view.get_user(expired)
+
+
+class UserRegistryTestCase(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.ada = Player.objects.create(username="ada", email="ada@example.com")
+        self.bob = Player.objects.create(username="bob")
+
+    def test_get_loads_the_user_of_a_type(self):
+        with self.assertNumQueries(1):
+            user = user_registry.get("player", self.ada.pk)
+        self.assertEqual(user, self.ada)
+        with self.assertRaises(LookupError):
+            user_registry.get("pirate", self.ada.pk)
+
+    def test_get_many_uses_one_query_per_type(self):
+        with self.assertNumQueries(1):
+            users = user_registry.get_many(
+                [("player", self.ada.pk), ("player", str(self.bob.pk)), ("player", 0)]
+            )
+        self.assertEqual(
+            users, {("player", self.ada.pk): self.ada, ("player", str(self.bob.pk)): self.bob}
+        )
+
+    def test_string_models_are_resolved_on_first_use(self):
+        registry = UserRegistry()
+        registry.register("player", "core.Player")
+        self.assertEqual(registry.get_lookup("player").model, Player)
+        self.assertEqual(registry.get_user_type(Player), "player")
+        self.assertIsNone(registry.get_user_type(Guild))
+
+    def test_receivers_only_run_for_registered_models(self):
+        registry = UserRegistry()
+        receiver = mock.Mock()
+        registry.connect(receiver)
+        registry.register("player", "core.Player")
+        # an app that isn't installed is skipped instead of failing the checks
+        registry.register("pirate", "codera_schools.Pirate")
+
+        Guild.objects.create(name="Lovelace")
+        receiver.assert_not_called()
+        self.ada.save()
+        receiver.assert_called_once()
+        self.assertIs(receiver.call_args.kwargs["sender"], Player)
+
+    def test_cached_user_is_a_full_private_copy(self):
+        decoded = {"user_type": "player", "user_id": self.ada.pk, "exp": time.time() + 300}
+        view = CoreViewSet()
+        view.get_user(decoded)
+        with self.assertNumQueries(0):
+            user = view.get_user(decoded)
+            self.assertEqual(user.email, "ada@example.com")
+        user.email = "changed@example.com"
+        self.assertEqual(view.get_user(decoded).email, "ada@example.com")
+
+
+class TokenContextTestCase(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        verified_tokens.clear()
+        self.player = Player.objects.create(username="ada")
+        self.token = get_token(self.player)
+        self.request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def test_context_is_shared_by_the_request_and_its_drf_wrapper(self):
+        context = get_token_context(self.request)
+        self.assertIs(get_token_context(Request(self.request)), context)
+        self.assertTrue(context.is_valid)
+        self.assertEqual(context.payload["user_id"], self.player.pk)
+
+    def test_verified_tokens_are_not_verified_again(self):
+        payload, errors = verify_token(self.token)
+        self.assertEqual(errors, [])
+        with mock.patch("core.tokens.api_settings") as settings:
+            self.assertEqual(verify_token(self.token), (payload, []))
+        self.assertFalse(settings.mock_calls)
+
+    def test_invalid_token_reports_errors(self):
+        payload, errors = verify_token("not-a-token")
+        self.assertIsNone(payload)
+        self.assertTrue(errors)
+        self.assertIsNone(verified_tokens.get("not-a-token"))
+
+    def test_custom_auth_and_view_share_the_context(self):
+        self.assertTrue(CustomAuth().has_permission(self.request, None))
+        user, payload = CoreViewSet().get_decoded_token(self.request)
+        self.assertEqual(user, self.player)
+        self.assertIs(payload, get_token_context(self.request).payload)
+
+    def test_missing_and_invalid_tokens(self):
+        anonymous = RequestFactory().get("/")
+        self.assertFalse(CustomAuth().has_permission(anonymous, None))
+        self.assertEqual(CoreViewSet().get_decoded_token(anonymous), (None, None))
+
+        invalid = RequestFactory().get("/", HTTP_AUTHORIZATION="Bearer not-a-token")
+        with self.assertRaises(AuthenticationFailed):
+            CustomAuth().has_permission(invalid, None)
+        with self.assertRaises(AuthenticationFailed):
+            CoreViewSet().get_decoded_token(invalid)
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.guilds = [Guild.objects.create(name=f"guild {number}") for number in range(5)]
+        self.view = KeysetGuildViewSet.as_view({"get": "list"})
+
+    def get(self, url, **params):
+        return self.view(APIRequestFactory().get(url, params))
+
+    def test_pages_walk_every_row_newest_first(self):
+        names = []
+        response = self.get("/guilds/", page_size=2)
+        self.assertIsNone(response.data["previous"])
+        self.assertNotIn("count", response.data)
+        while True:
+            names += [item["name"] for item in response.data["results"]]
+            if response.data["next"] is None:
+                break
+            response = self.get(response.data["next"])
+        self.assertEqual(names, [guild.name for guild in reversed(self.guilds)])
+
+    def test_previous_link_returns_the_page_before(self):
+        first = self.get("/guilds/", page_size=2)
+        second = self.get(first.data["next"])
+        back = self.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+
+    def test_count_is_only_run_on_request(self):
+        response = self.get("/guilds/", page_size=2, count="true")
+        self.assertEqual(response.data["count"], 5)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.get("/guilds/", cursor="garbage").status_code, 404)
+        position = (self.guilds[0].created_at, "not-an-id")
+        self.assertEqual(self.get("/guilds/", cursor=encode_cursor(position)).status_code, 404)
+
+    def test_cursor_round_trip(self):
+        position = (self.guilds[0].created_at, self.guilds[0].pk)
+        self.assertEqual(decode_cursor(encode_cursor(position, True)), (position, True))
+        with self.assertRaises(ValueError):
+            decode_cursor("garbage")
+
+
+class BulkActionTestCase(TestCase):
+    def setUp(self):
+        self.view = ScopedGuildViewSet.as_view(
+            {"post": "bulk", "put": "bulk", "patch": "bulk", "delete": "bulk"}
+        )
+        self.open = Guild.objects.create(name="open")
+        self.hidden = Guild.objects.create(name="hidden")
+
+    def request(self, method, data):
+        request = getattr(APIRequestFactory(), method)("/guilds/bulk/", data, format="json")
+        return self.view(request)
+
+    def get_error_indexes(self, response):
+        return [error["index"] for error in response.data["errors"]]
+
+    def test_create_reports_invalid_items(self):
+        response = self.request(
+            "post", [{"name": "open a"}, {"description": "x"}, {"name": "open b"}]
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(self.get_error_indexes(response), [1])
+        self.assertEqual(
+            set(Guild.objects.filter(pk__in=response.data["ids"]).values_list("name", flat=True)),
+            {"open a", "open b"},
+        )
+
+    def test_nothing_valid_is_a_bad_request(self):
+        response = self.request("post", [{"description": "x"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["count"], 0)
+
+    def test_update_reports_invalid_ids_per_item(self):
+        response = self.request(
+            "patch",
+            [
+                {"id": self.open.pk, "name": "open renamed"},
+                {"id": "abc", "name": "open x"},
+                {"id": {"nested": 1}, "name": "open y"},
+                {"name": "open z"},
+                {"id": 0, "name": "open w"},
+            ],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["ids"], [self.open.pk])
+        self.assertEqual(self.get_error_indexes(response), [1, 2, 3, 4])
+        self.open.refresh_from_db()
+        self.assertEqual(self.open.name, "open renamed")
+
+    def test_update_only_touches_rows_of_the_queryset(self):
+        response = self.request("put", [{"id": self.hidden.pk, "name": "open now"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["errors"], [{"index": 0, "errors": ["Not found."]}])
+        self.hidden.refresh_from_db()
+        self.assertEqual(self.hidden.name, "hidden")
+
+    def reject(self, method, name):
+        """Make Guild.objects.`method` fail like a constraint would for
+        rows named `name`."""
+        write = getattr(Guild.objects, method)
+
+        def rejecting(objs, *args, **kwargs):
+            if any(obj.name == name for obj in objs):
+                raise IntegrityError("UNIQUE constraint failed: core_guild.secret_column")
+            return write(objs, *args, **kwargs)
+
+        return mock.patch.object(Guild.objects, method, rejecting)
+
+    def test_create_reports_database_errors_per_item(self):
+        with self.reject("bulk_create", "open b"), self.assertLogs("core.serializers"):
+            response = self.request(
+                "post", [{"name": "open a"}, {"name": "open b"}, {"name": "open c"}]
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["errors"], [{"index": 1, "errors": ["Could not be saved."]}])
+        self.assertNotIn("secret_column", str(response.data))
+        self.assertEqual(Guild.objects.filter(name__in=["open a", "open c"]).count(), 2)
+
+    def test_update_reports_database_errors_per_item(self):
+        other = Guild.objects.create(name="open other")
+        with self.reject("bulk_update", "open bad"), self.assertLogs("core.serializers"):
+            response = self.request(
+                "patch",
+                [{"id": self.open.pk, "name": "open bad"}, {"id": other.pk, "name": "open ok"}],
+            )
+        self.assertEqual(response.data["ids"], [other.pk])
+        self.assertEqual(response.data["errors"], [{"index": 0, "errors": ["Could not be saved."]}])
+        self.open.refresh_from_db()
+        self.assertEqual(self.open.name, "open")
+
+    def test_many_save_is_all_or_nothing(self):
+        serializer = GuildSerializer(data=[{"name": "a"}, {"name": "b"}], many=True)
+        self.assertTrue(serializer.is_valid())
+        with self.reject("bulk_create", "b"), self.assertLogs("core.serializers"):
+            with self.assertRaises(serializers.ValidationError) as raised:
+                serializer.save()
+        self.assertEqual(
+            raised.exception.detail, [{"index": "1", "errors": ["Could not be saved."]}]
+        )
+        self.assertFalse(Guild.objects.filter(name="a").exists())
+
+    def test_destroy_reports_invalid_and_hidden_ids(self):
+        response = self.request(
+            "delete", [{"id": self.open.pk}, "abc", {"id": []}, self.hidden.pk]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["ids"], [self.open.pk])
+        self.assertEqual(self.get_error_indexes(response), [1, 2, 3])
+        self.assertTrue(Guild.objects.filter(pk=self.hidden.pk).exists())
+        self.assertFalse(Guild.objects.filter(pk=self.open.pk).exists())
+
+
+class FieldPlanTestCase(TestCase):
+    def test_plan_is_built_once_per_class(self):
+        plan = HeroSerializer.get_field_plan()
+        self.assertIs(HeroSerializer.get_field_plan(), plan)
+        self.assertEqual([name for name, _ in plan.writable], ["name", "guild", "level"])
+        self.assertEqual(plan.relations, {"guild": "guild_id"})
+        self.assertIsNot(GuildSerializer.get_field_plan(), plan)
+
+    def test_create_fills_in_defaults(self):
+        guild = Guild.objects.create(name="Lovelace")
+        serializer = HeroSerializer(data={"name": "ada", "guild": guild.pk})
+        serializer.is_valid(raise_exception=True)
+        hero = serializer.create(serializer.validated_data)
+        self.assertEqual((hero.name, hero.level, hero.guild), ("ada", 1, guild))
+        self.assertEqual(
+            HeroSerializer().get_create_kwargs({"name": "ada", "created_at": None}),
+            {"name": "ada", "guild": None, "level": 1},
+        )
+
+
+class TargetedUpdateTestCase(TestCase):
+    def setUp(self):
+        self.guild = Guild.objects.create(name="Lovelace")
+        self.hero = Hero.objects.create(name="ada", guild=self.guild)
+
+    def update(self, instance, data):
+        serializer = HeroSerializer(instance, data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_only_changed_columns_are_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.update(self.hero, {"level": 7})
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"level"', updates[0])
+        self.assertIn('"updated_at"', updates[0])
+        self.assertNotIn('"name"', updates[0])
+        self.hero.refresh_from_db()
+        self.assertEqual(self.hero.level, 7)
+
+    def test_unchanged_values_are_not_saved(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.update(self.hero, {"name": "ada", "guild": self.guild.pk})
+        self.assertFalse([query for query in queries if query["sql"].startswith("UPDATE")])
+
+    def test_non_updateable_fields_are_ignored(self):
+        class DescriptionSerializer(GuildSerializer):
+            class Meta(GuildSerializer.Meta):
+                updateable_fields = ("description",)
+
+        changed = DescriptionSerializer().apply_changes(
+            self.guild, {"name": "x", "description": "y"}
+        )
+        self.assertEqual(changed, ["description"])
+        self.assertEqual(self.guild.name, "Lovelace")
+
+
+class CompiledRepresentationTestCase(TestCase):
+    def setUp(self):
+        self.guilds = [
+            Guild.objects.create(name=f"guild {number}", description="x") for number in range(3)
+        ]
+
+    def test_compiled_rows_match_to_representation(self):
+        compiled = GuildReadOnlySerializer.get_compiled_representation()
+        self.assertEqual(set(compiled.sources), {"id", "name", "description", "created_at"})
+        for row in Guild.objects.values(*compiled.sources):
+            guild = Guild.objects.get(pk=row["id"])
+            self.assertEqual(compiled.represent(row), GuildReadOnlySerializer(guild).data)
+
+    def test_relations_and_methods_are_not_compiled(self):
+        class HeroReadOnlySerializer(CoreReadOnlySerializer):
+            guild = serializers.PrimaryKeyRelatedField(read_only=True)
+
+            class Meta:
+                model = Hero
+                fields = ("guild",)
+
+        class LoudGuildSerializer(GuildReadOnlySerializer):
+            loud = serializers.SerializerMethodField()
+
+            def get_loud(self, guild):
+                return guild.name.upper()
+
+        self.assertIsNone(HeroReadOnlySerializer.get_compiled_representation())
+        self.assertIsNone(LoudGuildSerializer.get_compiled_representation())
+
+    def test_list_is_served_from_values_rows(self):
+        view = GuildReadOnlyViewSet.as_view({"get": "list"})
+        GuildReadOnlySerializer.get_compiled_representation()
+        # rendering an instance would fail, the compiled function is used
+        with mock.patch.object(
+            GuildReadOnlySerializer, "to_representation", side_effect=AssertionError
+        ):
+            response = view(APIRequestFactory().get("/guilds/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["results"], GuildReadOnlySerializer(self.guilds, many=True).data
+        )
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.guild = Guild.objects.create(name="Lovelace")
+        self.factory = APIRequestFactory()
+
+    def get(self, viewset, action="list", **headers):
+        view = viewset.as_view({"get": action})
+        if action == "retrieve":
+            return view(self.factory.get("/guilds/1/", **headers), pk=self.guild.pk)
+        return view(self.factory.get("/guilds/", **headers))
+
+    def test_list_answers_304_until_a_row_changes(self):
+        etag = self.get(GuildReadOnlyViewSet)["ETag"]
+        response = self.get(GuildReadOnlyViewSet, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.guild.name = "Hopper"
+        self.guild.save()
+        response = self.get(GuildReadOnlyViewSet, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_delete_changes_the_list_etag(self):
+        Guild.objects.create(name="Hopper")
+        etag = self.get(GuildReadOnlyViewSet)["ETag"]
+        self.guild.delete()
+        self.assertNotEqual(self.get(GuildReadOnlyViewSet)["ETag"], etag)
+
+    def test_retrieve_sends_etag_and_last_modified(self):
+        response = self.get(GuildReadOnlyViewSet, "retrieve")
+        self.assertEqual(response.data["name"], "Lovelace")
+        self.assertIn("Last-Modified", response)
+        response = self.get(
+            GuildReadOnlyViewSet, "retrieve", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_the_caller(self):
+        anonymous = self.get(GuildReadOnlyViewSet)["ETag"]
+        other = self.get(GuildReadOnlyViewSet, HTTP_AUTHORIZATION="Bearer other")["ETag"]
+        self.assertNotEqual(anonymous, other)
+
+    def test_off_unless_enabled(self):
+        class DefaultGuildReadOnlyViewSet(ReadOnlyCoreViewSet):
+            serializer_class = GuildReadOnlySerializer
+            authentication_classes = ()
+
+        self.assertNotIn("ETag", self.get(DefaultGuildReadOnlyViewSet))
+
+    def test_off_for_nested_serializers(self):
+        Hero.objects.create(name="Ada", guild=self.guild)
+        view = HeroWithGuildReadOnlyViewSet.as_view({"get": "list"})
+        response = view(self.factory.get("/heroes/"))
+        self.assertNotIn("ETag", response)
+
+        self.guild.name = "Hopper"
+        self.guild.save()
+        response = view(self.factory.get("/heroes/", HTTP_IF_NONE_MATCH='"*"'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["guild"]["name"], "Hopper")
+
+    def test_cached_payload_is_reused_until_a_save(self):
+        first = self.get(CachedGuildReadOnlyViewSet)
+        with mock.patch.object(
+            CachedGuildReadOnlyViewSet, "render_list", side_effect=AssertionError
+        ):
+            self.assertEqual(self.get(CachedGuildReadOnlyViewSet).data, first.data)
+        self.guild.save()
+        response = self.get(CachedGuildReadOnlyViewSet)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+
+@override_settings(ROOT_URLCONF="core.tests")
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        recorder.reset()
+
+    def test_sql_shape_collapses_in_lists(self):
+        self.assertEqual(
+            sql_shape("SELECT 1 WHERE id IN (%s, %s, %s)"), "SELECT 1 WHERE id IN (...)"
+        )
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram(window=100)
+        for value in range(1, 101):
+            histogram.add(value)
+        self.assertEqual(histogram.summary(), {"p50": 51, "p95": 96, "p99": 100, "max": 100})
+        self.assertEqual(Histogram(window=10).summary(), {})
+
+    def test_requests_of_instrumented_views_are_recorded(self):
+        Guild.objects.create(name="Lovelace")
+        self.client.get("/guilds/")
+        self.client.get("/guilds/")
+        stats = recorder.snapshot()["core.tests.GuildViewSet.list"]
+        self.assertEqual(stats["count"], 2)
+        self.assertEqual(stats["errors"], 0)
+        self.assertGreaterEqual(stats["queries"]["max"], 1)
+
+    def test_repeated_queries_are_reported_as_n_plus_one(self):
+        collector = QueryCollector()
+        for _ in range(10):
+            collector.shapes["SELECT * FROM hero WHERE id = %s"] += 1
+        recorder.record("view.list", 0.01, collector, size=10)
+        n_plus_one = recorder.snapshot()["view.list"]["n_plus_one"]
+        self.assertEqual(n_plus_one["count"], 1)
+        self.assertEqual(n_plus_one["examples"][0]["count"], 10)
+
+    def test_report_is_staff_only(self):
+        self.assertIn(self.client.get("/__instrumentation__/").status_code, (401, 403))
+
+
+class QueryPlanTestCase(TestCase):
+    def test_forward_relations_are_joined(self):
+        plan = build_query_plan(HeroWithGuildSerializer, Hero)
+        self.assertEqual(plan.select_related, ("guild",))
+        self.assertEqual(plan.prefetch_related, ())
+        self.assertEqual(
+            set(plan.only),
+            {
+                "id",
+                "name",
+                "guild",
+                "guild__id",
+                "guild__name",
+                "guild__description",
+                "guild__created_at",
+            },
+        )
+
+    def test_reverse_relations_are_prefetched(self):
+        plan = build_query_plan(GuildWithHeroesSerializer, Guild)
+        self.assertEqual(plan.select_related, ())
+        self.assertEqual(plan.prefetch_related, ("heroes",))
+
+    def test_pk_only_relations_need_no_join(self):
+        plan = build_query_plan(HeroSerializer, Hero)
+        self.assertEqual(plan.select_related, ())
+        self.assertIn("guild", plan.only)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        view = HeroViewSet.as_view({"get": "list"})
+        guild = Guild.objects.create(name="Lovelace")
+        Hero.objects.create(name="ada", guild=guild)
+        with CaptureQueriesContext(connection) as one:
+            view(APIRequestFactory().get("/heroes/"))
+        for number in range(5):
+            Hero.objects.create(name=f"hero {number}", guild=Guild.objects.create(name="x"))
+        with CaptureQueriesContext(connection) as many:
+            response = view(APIRequestFactory().get("/heroes/"))
+        self.assertEqual(len(response.data["results"]), 6)
+        self.assertEqual(len(many), len(one))
+
+    def test_class_hints_override_the_plan(self):
+        class HintedHeroViewSet(HeroViewSet):
+            select_related_fields = ()
+            only_fields = ("name",)
+
+        plan = HintedHeroViewSet.get_query_plan()
+        self.assertEqual(plan.select_related, ())
+        self.assertEqual(plan.only, ("name",))
+
+
+class FormViewTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "secret")
+        self.guild = Guild.objects.create(name="Lovelace", description="keep")
+
+    def post(self, view_class, data, **kwargs):
+        request = RequestFactory().post("/", data)
+        request.user = self.admin
+        return view_class.as_view()(request, **kwargs)
+
+    def test_object_is_loaded_once_and_only_form_fields_are_saved(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(GuildFormView, {"name": "Hopper"}, pk=self.guild.pk)
+        self.assertEqual(response.status_code, 302)
+        selects = [query for query in queries if query["sql"].startswith("SELECT")]
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(selects), 1)
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"description"', updates[0])
+        self.guild.refresh_from_db()
+        self.assertEqual((self.guild.name, self.guild.description), ("Hopper", "keep"))
+
+    def test_without_pk_a_new_object_is_created(self):
+        self.post(GuildFormView, {"name": "Hopper"})
+        self.assertTrue(Guild.objects.filter(name="Hopper").exists())
+
+    def test_delete_reuses_the_loaded_object(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(GuildDeleteFormView, {}, pk=self.guild.pk)
+        self.assertEqual(response.status_code, 302)
+        selects = [
+            query for query in queries if query["sql"].startswith('SELECT "core_guild"')
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertFalse(Guild.objects.filter(pk=self.guild.pk).exists())
+
+    def test_views_share_the_cached_object_mixin(self):
+        view = GuildFormView()
+        view.kwargs = {"pk": self.guild.pk}
+        with self.assertNumQueries(1):
+            self.assertIs(view.get_object(), view.get_object())
+        view = GuildDeleteFormView()
+        view.kwargs = {}
+        self.assertIsNone(view.get_object())
+
+
+class CompiledLayoutTestCase(TestCase):
+    def test_layout_is_shared_by_the_instances_of_a_class(self):
+        self.assertIs(GuildForm().helper.layout, GuildForm().helper.layout)
+        self.assertIsNot(GuildDeleteForm().helper.layout, GuildForm().helper.layout)
+
+    def test_compile_layout_false_builds_one_per_instance(self):
+        class InstanceGuildForm(GuildForm):
+            compile_layout = False
+
+        self.assertIsNot(InstanceGuildForm().helper.layout, InstanceGuildForm().helper.layout)
+
+    def test_static_fragment_renders_once_per_template_pack(self):
+        layout_object = mock.Mock()
+        layout_object.render.return_value = "<div></div>"
+        fragment = StaticFragment(layout_object)
+        form = GuildForm()
+        for _ in range(3):
+            self.assertEqual(fragment.render(form, {}, template_pack="bootstrap5"), "<div></div>")
+        fragment.render(form, {}, template_pack="bootstrap4")
+        self.assertEqual(layout_object.render.call_count, 2)
+
+    def test_rendered_form_keeps_the_bound_values(self):
+        html = render_crispy_form(GuildForm(data={"name": "Lovelace"}))
+        self.assertIn('value="Lovelace"', html)
+        self.assertIn("card-header", html)
+        self.assertIn("Lovelace", render_crispy_form(GuildForm(data={"name": "Lovelace"})))
+        self.assertNotIn("Lovelace", render_crispy_form(GuildForm(data={"name": "Hopper"})))
+
+
+class ListViewTestCase(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.guilds = [Guild.objects.create(name=f"guild {number}") for number in range(5)]
+
+    def get_context(self, **params):
+        view = GuildListView()
+        view.setup(RequestFactory().get("/guilds/", params))
+        view.object_list = view.get_queryset()
+        return view.get_context_data()
+
+    def test_keyset_pages_link_to_each_other(self):
+        with mock.patch("core.views.render_to_string", return_value=""):
+            context = self.get_context()
+            self.assertEqual(
+                [guild.name for guild in context["object_list"]], ["guild 4", "guild 3"]
+            )
+            self.assertIsNone(context["previous_url"])
+            cursor = context["next_url"].split("cursor=")[1]
+            context = self.get_context(cursor=cursor)
+        self.assertEqual([guild.name for guild in context["object_list"]], ["guild 2", "guild 1"])
+        self.assertIsNotNone(context["previous_url"])
+
+    def test_invalid_cursor_is_a_404(self):
+        with self.assertRaises(Http404):
+            self.get_context(cursor="garbage")
+        position = (self.guilds[0].created_at, "not-an-id")
+        with self.assertRaises(Http404):
+            self.get_context(cursor=encode_cursor(position))
+
+    def test_unchanged_rows_are_rendered_once(self):
+        def render(template_name, context):
+            return f"<li>{context['object'].name}</li>"
+
+        with mock.patch("core.views.render_to_string", side_effect=render) as rendered:
+            self.assertEqual(
+                self.get_context()["rendered_rows"], ["<li>guild 4</li>", "<li>guild 3</li>"]
+            )
+            self.get_context()
+            self.assertEqual(rendered.call_count, 2)
+            self.guilds[4].name = "renamed"
+            self.guilds[4].save()
+            self.assertEqual(self.get_context()["rendered_rows"][0], "<li>renamed</li>")
+            self.assertEqual(rendered.call_count, 3)
+
+
+class EstimatedCountTestCase(TestCase):
+    def setUp(self):
+        for number in range(3):
+            Guild.objects.create(name=f"guild {number}")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def test_big_unfiltered_tables_use_the_estimate(self):
+        self.assertEqual(estimate_count(Guild.objects.all()), 3)
+        self.assertIsNone(estimate_count(Guild.objects.filter(name="guild 1")))
+        paginator = EstimatedCountPaginator(Guild.objects.all(), 2, threshold=1)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 3)
+        self.assertTrue(paginator.estimated)
+
+    def test_small_tables_are_counted(self):
+        paginator = EstimatedCountPaginator(Guild.objects.all(), 2, threshold=1000)
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.estimated)
+
+
+@override_settings(ROOT_URLCONF="core.tests")
+class LoginMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.middleware = LoginMiddleware(lambda request: HttpResponse())
+        self.loaded = []
+
+    def process(self, path, view_name=None):
+        request = RequestFactory().get(path)
+        request.user = SimpleLazyObject(lambda: self.loaded.append(path) or AnonymousUser())
+        request.resolver_match = mock.Mock(view_name=view_name) if view_name else None
+        self.middleware(request)
+        return self.middleware.process_view(request, None, (), {})
+
+    def test_exempt_paths_never_load_the_user(self):
+        for path in ("/doc/", "/doc.json", "/doc.yaml", "/api/guilds/", "/static/app.css"):
+            self.assertIsNone(self.process(path), path)
+        self.assertEqual(self.loaded, [])
+
+    def test_paths_next_to_exempt_ones_require_login(self):
+        for path in ("/doctor/", "/documents/", "/doc.json.bak", "/apis/"):
+            response = self.process(path)
+            self.assertEqual(response["Location"], f"/login/?next={path}")
+        self.assertEqual(len(self.loaded), 4)
+
+    def test_exempt_routes_never_load_the_user(self):
+        self.assertIsNone(self.process("/accounts/sign-in/", view_name="login"))
+        self.assertEqual(self.loaded, [])
+
+    def test_prefixes_and_exact_paths(self):
+        pattern = compile_exempt_paths(["static/", "/doc.json", "https://cdn.example.com/"])
+        self.assertTrue(pattern.match("/static/app.css"))
+        self.assertTrue(pattern.match("/doc.json"))
+        self.assertFalse(pattern.match("/doc.jsonp"))
+        self.assertFalse(pattern.match("/cdn.example.com/"))
+        self.assertIsNone(compile_exempt_paths(["", "//cdn.example.com/"]))
+
+
+@override_settings(ROOT_URLCONF="core.tests")
+class AsyncViewSetTestCase(TestCase):
+    def test_views_are_coroutine_functions(self):
+        self.assertTrue(iscoroutinefunction(AsyncGuildViewSet.as_view({"get": "list"})))
+        self.assertFalse(iscoroutinefunction(GuildViewSet.as_view({"get": "list"})))
+
+    async def test_crud_actions(self):
+        response = await self.async_client.post(
+            "/async/guilds/", {"name": "Lovelace"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        pk = (await Guild.objects.aget(name="Lovelace")).pk
+
+        response = await self.async_client.get("/async/guilds/")
+        self.assertEqual([item["name"] for item in response.json()["results"]], ["Lovelace"])
+
+        response = await self.async_client.patch(
+            f"/async/guilds/{pk}/", {"name": "Hopper"}, content_type="application/json"
+        )
+        self.assertEqual(response.json()["name"], "Hopper")
+        response = await self.async_client.get(f"/async/guilds/{pk}/")
+        self.assertEqual(response.json()["name"], "Hopper")
+
+        response = await self.async_client.delete(f"/async/guilds/{pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(await Guild.objects.filter(pk=pk).aexists())
+        self.assertEqual((await self.async_client.get(f"/async/guilds/{pk}/")).status_code, 404)
+
+    async def test_read_only_list_answers_304(self):
+        await Guild.objects.acreate(name="Lovelace")
+        response = await self.async_client.get("/async/read-only/guilds/")
+        self.assertEqual(response.json()["results"][0]["name"], "Lovelace")
+        response = await self.async_client.get(
+            "/async/read-only/guilds/", headers={"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class SQLiteProfileTestCase(TestCase):
+    def test_pragma_statements(self):
+        self.assertEqual(
+            get_pragma_statements({"journal_mode": "WAL", "busy_timeout": 5000}),
+            ["PRAGMA journal_mode = WAL", "PRAGMA busy_timeout = 5000"],
+        )
+
+    def test_new_connections_get_the_profile(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            # 1 is NORMAL
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_immediate_transactions_are_opt_in(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("SQLITE_TRANSACTION_MODE", None)
+            options = runpy.run_module("WebText.settings")["DATABASES"]["default"]["OPTIONS"]
+            self.assertNotIn("transaction_mode", options)
+            os.environ["SQLITE_TRANSACTION_MODE"] = "IMMEDIATE"
+            options = runpy.run_module("WebText.settings")["DATABASES"]["default"]["OPTIONS"]
+            self.assertEqual(options["transaction_mode"], "IMMEDIATE")
+
+    def test_other_vendors_and_empty_profiles_are_left_alone(self):
+        other = mock.Mock(vendor="postgresql")
+        configure_sqlite(None, other)
+        other.cursor.assert_not_called()
+        sqlite = mock.Mock(vendor="sqlite")
+        with override_settings(CORE={"SQLITE_PRAGMAS": {}}):
+            configure_sqlite(None, sqlite)
+        sqlite.cursor.assert_not_called()
+
+
+class ReadWriteRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.pool = ReplicaPool(aliases=["replica"])
+        patcher = mock.patch("core.routers.replicas", self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = ReadWriteRouter()
+        self.factory = RequestFactory()
+
+    def read_alias(self, request, read_only=True):
+        with mock.patch.object(ReplicaPool, "is_healthy", return_value=True):
+            with route_request(request, read_only):
+                return self.router.db_for_read(Guild)
+
+    def test_read_only_requests_read_from_a_replica(self):
+        self.assertEqual(self.read_alias(self.factory.get("/")), "replica")
+        self.assertIsNone(self.read_alias(self.factory.get("/"), read_only=False))
+        self.assertFalse(read_from_replica.get())
+
+    def test_writers_read_their_writes_from_the_primary(self):
+        with route_request(self.factory.post("/"), False):
+            self.assertEqual(self.router.db_for_write(Guild), "default")
+        self.assertIsNone(self.read_alias(self.factory.get("/")))
+        other = self.factory.get("/", REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(self.read_alias(other), "replica")
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+            "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+        CORE={"READ_STICKY_CACHE": "shared"},
+    )
+    def test_stickiness_is_kept_in_the_configured_cache(self):
+        caches["shared"].clear()
+        with route_request(self.factory.post("/"), False):
+            pass
+        self.assertIsNone(self.read_alias(self.factory.get("/")))
+        self.assertEqual(len(caches["shared"]._cache), 1)
+
+    def test_check_warns_about_process_local_caches(self):
+        with override_settings(CORE={"READ_DATABASES": []}):
+            self.assertEqual(check_sticky_cache(), [])
+        with override_settings(CORE={"READ_DATABASES": ["replica"]}):
+            self.assertEqual([error.id for error in check_sticky_cache()], ["core.W001"])
+        with override_settings(
+            CORE={"READ_DATABASES": ["replica"], "READ_STICKY_CACHE": "shared"}
+        ):
+            self.assertEqual([error.id for error in check_sticky_cache()], ["core.E001"])
+        with override_settings(
+            CORE={"READ_DATABASES": ["replica"]},
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache"}},
+        ):
+            self.assertEqual(check_sticky_cache(), [])
+
+    def test_unhealthy_replicas_are_skipped(self):
+        with mock.patch.object(ReplicaPool, "get_lag", return_value=60.0):
+            self.pool.check_health(force=True)
+        self.assertEqual(self.pool.healthy, [])
+        # checked again only after REPLICA_CHECK_INTERVAL
+        self.assertIsNone(self.read_alias(self.factory.get("/")))
+
+    def test_replicas_are_never_migrated(self):
+        self.assertIs(self.router.allow_migrate("replica", "core"), False)
+        self.assertIsNone(self.router.allow_migrate("default", "core"))
+
+    def test_without_replicas_nothing_is_routed(self):
+        self.pool._aliases = []
+        with route_request(self.factory.get("/"), True):
+            self.assertFalse(read_from_replica.get())
+
+
+class PasswordGeneratorTestCase(SimpleTestCase):
+    def test_passwords_use_the_requested_alphabet(self):
+        passwords = PasswordGenerator.generate_many(50, 16, symbols_include=False)
+        self.assertEqual(len(passwords), 50)
+        alphabet = set(PasswordGenerator.get_alphabet(False, True))
+        for password in passwords:
+            self.assertEqual(len(password), 16)
+            self.assertLessEqual(set(password), alphabet)
+        self.assertEqual(len(set(passwords)), 50)
+
+    def test_backslash_and_space_are_never_used(self):
+        self.assertFalse(set(PasswordGenerator.generate(2000)) & {"\\", " "})
+
+    def test_empty_passwords(self):
+        self.assertEqual(PasswordGenerator.generate(0), "")
+        self.assertEqual(PasswordGenerator.random(length=0), "")
+        self.assertEqual(PasswordGenerator.generate_many(3, 0), ["", "", ""])
+        self.assertEqual(PasswordGenerator.generate_many(0, 12), [])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProvisionUsersTestCase(TestCase):
+    def test_users_are_created_with_their_passwords(self):
+        User.objects.create(username="existing")
+        rows = [{"username": "ada", "email": "ada@example.com", "grade": "5"}]
+        rows.append({"username": "existing"})
+        created, skipped, errors = provision_users(User, rows, password_length=10, workers=1)
+        self.assertEqual(skipped, ["existing"])
+        self.assertEqual(errors, [])
+        (username, password), = created
+        user = User.objects.get(username=username)
+        self.assertEqual((user.email, len(password)), ("ada@example.com", 10))
+        self.assertTrue(check_password(password, user.password))
+
+    def test_duplicate_and_missing_usernames_are_reported_before_hashing(self):
+        rows = [{"username": "ada"}, {"username": ""}, {"username": "ada"}, {"username": "bob"}]
+        with mock.patch(
+            "core.provisioning.hash_passwords", side_effect=lambda passwords, workers: passwords
+        ) as hash_passwords:
+            created, _, errors = provision_users(User, rows, workers=1)
+        self.assertEqual(len(hash_passwords.call_args.args[0]), 2)
+        self.assertEqual([username for username, _ in created], ["ada", "bob"])
+        self.assertEqual([error["index"] for error in errors], [1, 2])
+        self.assertIn("row 0", errors[1]["errors"][0])
+
+    def test_command_reports_the_csv_lines(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        directory = Path(temporary.name)
+        source = directory / "accounts.csv"
+        source.write_text("username,email\nada,ada@example.com\nada,other@example.com\n")
+        output = directory / "credentials.csv"
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command(
+            "provision_users",
+            csv=str(source),
+            output=str(output),
+            workers=1,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        self.assertIn("line 3", stderr.getvalue())
+        with open(output, newline="") as file:
+            self.assertEqual([row["username"] for row in csv.DictReader(file)], ["ada"])
+
+
+class BucketTestCase(TestCase):
+    def setUp(self):
+        guild = Guild.objects.create(name="Lovelace")
+        for day, level in (("2024-01-05", 2), ("2024-01-31", 3), ("2024-03-15", 4)):
+            hero = Hero.objects.create(name=day, guild=guild, level=level)
+            created_at = datetime.datetime.fromisoformat(f"{day}T12:00:00+00:00")
+            Hero.objects.filter(pk=hero.pk).update(created_at=created_at)
+
+    def test_months_are_counted_with_one_query(self):
+        with self.assertNumQueries(1):
+            buckets = bucket_aggregate(Hero.objects.all(), "2024-01-01", "2024-04-30")
+        self.assertEqual(
+            [(str(bucket.start), bucket.values["count"]) for bucket in buckets],
+            [("2024-01-01", 2), ("2024-02-01", 0), ("2024-03-01", 1), ("2024-04-01", 0)],
+        )
+        self.assertEqual(buckets[0].end, datetime.date(2024, 2, 1))
+
+    def test_other_aggregates_leave_empty_buckets_at_none(self):
+        buckets = bucket_aggregate(
+            Hero.objects.all(), "2024-01-01", "2024-03-31", levels=Sum("level")
+        )
+        self.assertEqual([bucket.values["levels"] for bucket in buckets], [5, None, 4])
+
+    def test_weeks_start_on_monday(self):
+        self.assertEqual(bucket_start("2024-01-31", "week"), datetime.date(2024, 1, 29))
+        buckets = bucket_aggregate(Hero.objects.all(), "2024-01-29", "2024-02-04", "week")
+        self.assertEqual([bucket.values["count"] for bucket in buckets], [1])
+        with self.assertRaises(ValueError):
+            bucket_start("2024-01-31", "fortnight")
+
+    def test_open_ended_ranges_are_fetched_by_chunk(self):
+        buckets = iter_bucket_aggregates(Hero.objects.all(), "2024-01-01", chunk_size=2)
+        with self.assertNumQueries(2):
+            counts = [bucket.values["count"] for bucket in islice(buckets, 4)]
+        self.assertEqual(counts, [2, 0, 1, 0])
+
+    def test_months_between_keep_the_day_of_month(self):
+        months = get_months_between("2024-01-31", "2024-04-30")
+        self.assertEqual(list(months), ["2024-01", "2024-02", "2024-03", "2024-04"])
+        self.assertEqual(str(months["2024-03"][0]), "2024-03-31")
+
+
+class SchemaCacheTestCase(TestCase):
+    def setUp(self):
+        self.schema_cache = SchemaCache(title="Test API", default_version="v1")
+        self.factory = RequestFactory()
+
+    def test_schema_is_rendered_once(self):
+        view = self.schema_cache.as_view()
+        with mock.patch.object(
+            SchemaCache, "render", wraps=self.schema_cache.render
+        ) as render:
+            json_response = view(self.factory.get("/doc.json"), format=".json")
+            yaml_response = view(self.factory.get("/doc.yaml"), format=".yaml")
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(json_response["Content-Type"], "application/json")
+        self.assertEqual(yaml_response["Content-Type"], "application/yaml")
+        self.assertIn(b'"Test API"', json_response.content)
+
+    def test_current_etag_gets_a_304(self):
+        view = self.schema_cache.as_view()
+        etag = view(self.factory.get("/doc.json"), format=".json")["ETag"]
+        response = view(self.factory.get("/doc.json", HTTP_IF_NONE_MATCH=etag), format=".json")
+        self.assertEqual(response.status_code, 304)
+        response = view(self.factory.post("/doc.json"), format=".json")
+        self.assertEqual(response.status_code, 405)
+
+    def test_unknown_format_is_a_404(self):
+        with self.assertRaises(Http404):
+            self.schema_cache.as_view()(self.factory.get("/doc.xml"), format=".xml")
+
+    def test_built_files_are_served_without_rendering(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        call_command(
+            "build_schema", output=temporary.name, url="https://api.example.com",
+            stdout=io.StringIO(),
+        )
+        content = (Path(temporary.name) / "schema.json").read_bytes()
+        self.assertIn(b"api.example.com", content)
+        with override_settings(CORE={"SCHEMA_DIR": temporary.name}):
+            with mock.patch.object(SchemaCache, "render", side_effect=AssertionError):
+                response = self.schema_cache.as_view()(self.factory.get("/"), format=".json")
+        self.assertEqual(response.content, content)
+
+    def test_schema_endpoint(self):
+        response = self.client.get("/doc.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       150 |        150 |   _io
+import time:     40000 |      40000 |   django
+import time:     30000 |      70000 |     django.db
+import time:      5000 |       5000 | core.api
+"""
+
+
+class ImportProfileTestCase(SimpleTestCase):
+    def test_parse_importtime(self):
+        times = parse_importtime("some warning\n" + IMPORTTIME_OUTPUT)
+        self.assertEqual(
+            times, {"_io": 150, "django": 40000, "django.db": 30000, "core.api": 5000}
+        )
+        self.assertEqual(
+            group_by_package(times), {"_io": 150, "django": 70000, "core": 5000}
+        )
+
+    def test_over_the_module_budget_warns(self):
+        out = io.StringIO()
+        with mock.patch(
+            "core.management.commands.import_profile.Command.measure",
+            return_value=parse_importtime(IMPORTTIME_OUTPUT),
+        ):
+            call_command("import_profile", budget=100, module_budget=50, stdout=out)
+        self.assertIn("4 modules in 75.2 ms", out.getvalue())
+        self.assertIn("1 over the 50 ms budget: django", out.getvalue())
+
+    def test_over_the_budget_fails(self):
+        with mock.patch(
+            "core.management.commands.import_profile.Command.measure",
+            return_value=parse_importtime(IMPORTTIME_OUTPUT),
+        ), self.assertRaisesMessage(CommandError, "the budget is 50"):
+            call_command("import_profile", budget=50, stdout=io.StringIO())
+
+    def test_failed_startup(self):
+        result = mock.Mock(returncode=1, stderr="ImportError: boom")
+        with mock.patch("subprocess.run", return_value=result), self.assertRaisesMessage(
+            CommandError, "ImportError: boom"
+        ):
+            call_command("import_profile", repeat=1, stdout=io.StringIO())
+
+    def test_user_models_are_not_resolved_at_import(self):
+        import core.api
+
+        lookup = user_registry.get_lookup("admin")
+        self.assertEqual(lookup._model, "codera_schools.AdminUser")
+        # the legacy names are still importable, and resolved when read
+        with self.assertRaises(LookupError):
+            core.api.adminuser_model
+        self.assertEqual(lookup._model, "codera_schools.AdminUser")
+        with self.assertRaises(AttributeError):
+            core.api.pirate_model
+
+    def test_production_profile_leaves_the_dev_apps_out(self):
+        from WebText import production
+
+        self.assertFalse(production.DEBUG)
+        for app in production.DEV_APPS:
+            self.assertNotIn(app, production.INSTALLED_APPS)
+        for middleware in production.DEV_MIDDLEWARE:
+            self.assertNotIn(middleware, production.MIDDLEWARE)
+        self.assertIn("core", production.INSTALLED_APPS)
+        self.assertIsNotNone(production.CORE["SCHEMA_DIR"])
+
+
+class StaticFilesTestCase(SimpleTestCase):
+    def setUp(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.static_root = Path(temporary.name) / "static"
+        self.media_root = Path(temporary.name) / "media"
+        self.write(self.static_root / "css/app.3f2a1b4c5d6e.css", "body { color: red; }\n" * 50)
+        self.write(self.static_root / "css/0123456789abcdef.css", "body {}")
+        self.write(self.media_root / "photos/20240101120000.jpg", "jpeg")
+        self.write(self.media_root / "derivatives/ab/abcdef.thumbnail.webp", "webp")
+        self.write(Path(temporary.name) / "secret.txt", "secret")
+        compress_file(self.static_root / "css/app.3f2a1b4c5d6e.css")
+        self.factory = RequestFactory()
+
+        storage = mock.Mock(hashed_files={"css/app.css": "css/app.3f2a1b4c5d6e.css"})
+        patcher = mock.patch("core.static.staticfiles_storage", storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, path, content):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    def get_handler(self, serve_media=True):
+        with self.settings(
+            STATIC_URL="/static/",
+            STATIC_ROOT=self.static_root,
+            MEDIA_URL="/media/",
+            MEDIA_ROOT=self.media_root,
+            CORE={"SERVE_MEDIA": serve_media},
+        ):
+            return StaticFilesHandler(mock.Mock())
+
+    def get(self, path, **extra):
+        handler = self.get_handler()
+        response = handler.serve(self.factory.get(path, **extra))
+        self.addCleanup(response.close)
+        return response
+
+    def test_only_manifest_names_are_immutable(self):
+        response = self.get("/static/css/app.3f2a1b4c5d6e.css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+        self.assertNotIn("Content-Security-Policy", response)
+        # a hex name that isn't in the manifest may still change
+        response = self.get("/static/css/0123456789abcdef.css")
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_only_derivatives_are_immutable_in_media(self):
+        response = self.get("/media/photos/20240101120000.jpg")
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+        self.assertIn("sandbox", response["Content-Security-Policy"])
+
+        response = self.get("/media/derivatives/ab/abcdef.thumbnail.webp")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Content-Type"], "image/webp")
+
+    def test_media_is_not_served_unless_enabled(self):
+        self.assertTrue(self.get_handler()._should_handle("/media/photos/20240101120000.jpg"))
+        handler = self.get_handler(serve_media=False)
+        self.assertFalse(handler._should_handle("/media/photos/20240101120000.jpg"))
+        self.assertTrue(handler._should_handle("/static/css/app.3f2a1b4c5d6e.css"))
+        with self.assertRaises(Http404):
+            handler.serve(self.factory.get("/media/photos/20240101120000.jpg"))
+
+    def test_gzip_variant_and_revalidation(self):
+        response = self.get("/static/css/app.3f2a1b4c5d6e.css", HTTP_ACCEPT_ENCODING="br, gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        response = self.get(
+            "/static/css/app.3f2a1b4c5d6e.css", HTTP_ACCEPT_ENCODING="gzip;q=0"
+        )
+        self.assertNotIn("Content-Encoding", response)
+
+        response = self.get(
+            "/static/css/app.3f2a1b4c5d6e.css", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+    def test_missing_and_outside_files_are_404(self):
+        request = self.factory.get("/")
+        for path in ("css/missing.css", "../secret.txt", "css", "/../../secret.txt"):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                serve(request, path, self.static_root)
+
+    def test_compress_file(self):
+        compressed = self.static_root / "css/app.3f2a1b4c5d6e.css.gz"
+        self.assertEqual(compress_file(self.static_root / "css/app.3f2a1b4c5d6e.css"), compressed)
+        # too small to be worth it, or not compressible
+        self.assertIsNone(compress_file(self.static_root / "css/0123456789abcdef.css"))
+        self.assertIsNone(compress_file(self.media_root / "photos/20240101120000.jpg"))
+
+
+class DevelopmentMediaTestCase(TestCase):
+    def reload_urls(self):
+        import WebText.urls
+
+        importlib.reload(WebText.urls)
+        clear_url_caches()
+
+    def test_uploads_are_served_with_debug(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        (Path(temporary.name) / "red.png").write_bytes(b"png")
+        self.addCleanup(self.reload_urls)
+        with override_settings(DEBUG=True, MEDIA_ROOT=temporary.name):
+            self.reload_urls()
+            response = self.client.get("/media/red.png")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b"".join(response.streaming_content), b"png")
+            with self.assertLogs("django.request", "WARNING"):
+                self.assertEqual(self.client.get("/media/blue.png").status_code, 404)
+
+
+class UploadsTestCase(SimpleTestCase):
+    def setUp(self):
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        settings = self.settings(
+            MEDIA_ROOT=temporary.name,
+            MEDIA_URL="/media/",
+            CORE={"IMAGE_DERIVATIVES": {"thumbnail": [32, 32], "small": [8, 8]}},
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(content_hashes.clear)
+
+        self.storage = FileSystemStorage(location=temporary.name)
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 48), "red").save(buffer, "PNG")
+        self.content = buffer.getvalue()
+        self.content_hash = hashlib.sha256(self.content).hexdigest()
+        self.name = self.storage.save("photos/red.png", io.BytesIO(self.content))
+
+    def test_handler_hashes_the_upload(self):
+        handler = HashingFileUploadHandler()
+        handler.new_file("image", "red.png", "image/png", len(self.content))
+        handler.receive_data_chunk(self.content[:100], 0)
+        handler.receive_data_chunk(self.content[100:], 100)
+        upload = handler.file_complete(len(self.content))
+        self.addCleanup(upload.close)
+        self.assertEqual(upload.content_hash, self.content_hash)
+        self.assertEqual(upload.size, len(self.content))
+
+    def test_make_derivatives_writes_webp_once(self):
+        with self.storage.open(self.name) as source:
+            written = make_derivatives(source, self.content_hash)
+        self.assertEqual(len(written), 2)
+        with Image.open(get_derivative_path(self.content_hash, "thumbnail")) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (32, 24)))
+        with Image.open(get_derivative_path(self.content_hash, "small")) as image:
+            self.assertEqual(image.size, (8, 6))
+        with self.storage.open(self.name) as source:
+            self.assertEqual(make_derivatives(source, self.content_hash), [])
+
+    def test_workers_skip_existing_and_queued_hashes(self):
+        workers = DerivativeWorkers()
+        workers._executor = mock.Mock()
+        self.assertTrue(workers.submit(self.storage, self.name, self.content_hash))
+        self.assertFalse(workers.submit(self.storage, self.name, self.content_hash))
+        with override_settings(CORE={"IMAGE_QUEUE_SIZE": 1}), self.assertLogs("core.uploads"):
+            self.assertFalse(workers.submit(self.storage, "photos/other.png", "0" * 64))
+
+        workers.run(self.storage, self.name, self.content_hash, None)
+        self.assertTrue(get_derivative_path(self.content_hash, "thumbnail").exists())
+        self.assertFalse(workers.submit(self.storage, self.name, self.content_hash))
+        self.assertEqual(workers._executor.submit.call_count, 1)
+
+    def test_urls_use_the_recorded_hash(self):
+        field_file = mock.Mock(spec=["name"])
+        field_file.name = self.name
+        self.assertIsNone(get_derivative_url_for(field_file, "thumbnail"))
+        self.assertIsNone(get_derivative_url_for(None, "thumbnail"))
+
+        with mock.patch("core.uploads.derivative_workers") as workers:
+            schedule_derivatives(self.storage, self.name, self.content_hash)
+        workers.submit.assert_called_once_with(self.storage, self.name, self.content_hash, None)
+
+        expected = f"/media/derivatives/{self.content_hash[:2]}/{self.content_hash}.thumbnail.webp"
+        # read back from disk, as another worker would
+        content_hashes.clear()
+        self.assertEqual(get_derivative_url_for(field_file, "thumbnail"), expected)
+
+        field_file.content_hash = "f" * 64
+        self.assertIn("/ff/", get_derivative_url_for(field_file, "thumbnail"))
@@ -0,0 +1,99 @@
+"""
+This file is used to define the bearer token handling for the game
+
+HOW TO:
+1. Call `get_token_context(request)` wherever the token is needed
+2. Read `context.payload` for the verified claims
+
+This File Does:
+
+1. Defines the TokenContext class
+2. Defines the extract_token and verify_token functions
+3. Defines the get_token_context function
+4. Caches verified tokens until they expire
+
+"""
+
+import time
+
+from rest_framework_simplejwt.authentication import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+
+from core.cache import LRUCache
+from core.conf import core_setting
+
+
+HTTP_AUTHORIZATION = "HTTP_AUTHORIZATION"
+
+# raw token -> verified payload, kept until the token's exp
+verified_tokens = LRUCache(maxsize=core_setting("TOKEN_CACHE_SIZE"))
+
+
+class TokenContext:
+    """The bearer token of one request, decoded and verified once."""
+
+    def __init__(self, raw_token=None, payload=None, errors=()):
+        self.raw_token = raw_token
+        self.payload = payload
+        self.errors = list(errors)
+
+    @property
+    def is_valid(self):
+        return self.payload is not None
+
+
+def extract_token(request):
+    """Return the raw token from the Authorization header, or None."""
+    header = request.META.get(HTTP_AUTHORIZATION, "").split()
+    if header:
+        return header[-1]
+    return None
+
+
+def verify_token(raw_token):
+    """Verify `raw_token` against `AUTH_TOKEN_CLASSES`.
+
+    Returns `(payload, errors)`. Tokens that were already verified are
+    served from `verified_tokens` without checking the signature again.
+    """
+    payload = verified_tokens.get(raw_token)
+    if payload is not None:
+        return payload, []
+
+    errors = []
+    for AuthToken in api_settings.AUTH_TOKEN_CLASSES:
+        try:
+            token = AuthToken(raw_token)
+        except TokenError as e:
+            errors.append(
+                {
+                    "token_class": AuthToken.__name__,
+                    "token_type": AuthToken.token_type,
+                    "message": e.args[0],
+                }
+            )
+            continue
+        payload = dict(token.payload)
+        timeout = payload.get("exp", 0) - time.time()
+        if timeout > 0:
+            verified_tokens.set(raw_token, payload, timeout)
+        return payload, []
+    return None, errors
+
+
+def get_token_context(request):
+    """Return the TokenContext of `request`, building it on first use.
+
+    The context is stored on the underlying HttpRequest, so a DRF Request
+    and the Django request it wraps share it.
+    """
+    request = getattr(request, "_request", request)
+    context = getattr(request, "_token_context", None)
+    if context is None:
+        raw_token = extract_token(request)
+        if raw_token is None:
+            context = TokenContext()
+        else:
+            context = TokenContext(raw_token, *verify_token(raw_token))
+        request._token_context = context
+    return context
@@ -0,0 +1,224 @@
+"""
+This file is used to define the upload handling and image derivatives for the game
+
+HOW TO:
+1. Keep "core.uploads.HashingFileUploadHandler" in FILE_UPLOAD_HANDLERS
+2. BaseFormView queues the derivatives of every ImageField uploaded through it,
+   call `schedule_derivatives(storage, name, content_hash)` from other code
+3. Link them with `get_derivative_url_for(obj.image, "thumbnail")`, or with
+   `get_derivative_url(content_hash, "thumbnail")` when the hash is at hand
+4. Sizes are set in CORE["IMAGE_DERIVATIVES"], e.g. `{"thumbnail": [320, 320]}`
+
+This File Does:
+
+1. Defines the HashingFileUploadHandler class, streaming uploads to a
+   temporary file on disk and hashing them chunk by chunk
+2. Defines the make_derivatives function, writing WebP derivatives under
+   MEDIA_ROOT/derivatives named after the content hash
+3. Defines the DerivativeWorkers class, a bounded thread pool that skips
+   hashes whose derivatives exist or are already queued
+4. Records the content hash of every stored upload next to its derivatives,
+   so their URLs are built without reading the upload again
+
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps
+
+from core.cache import LRUCache
+from core.conf import DERIVATIVE_DIR, core_setting
+
+
+logger = logging.getLogger(__name__)
+
+# DERIVATIVE_DIR/hashes/<stored name>.sha256 holds the hash of an upload
+HASH_DIR = "hashes"
+DERIVATIVE_FORMAT = "WEBP"
+DERIVATIVE_QUALITY = 80
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """Writes every upload to a temporary file, whatever its size, and
+    sets `content_hash` (sha256) on it. FileSystemStorage moves that file
+    in place when the model is saved, it is never held in memory."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+def get_content_hash(file, chunk_size=64 * 1024):
+    """sha256 of `file`, an uploaded or stored file, read by chunks."""
+    content_hash = getattr(file, "content_hash", None)
+    if content_hash:
+        return content_hash
+    hasher = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks(chunk_size):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def get_derivative_name(content_hash, name):
+    # under DERIVATIVE_DIR and named after the hash, core.static serves them as immutable
+    return f"{DERIVATIVE_DIR}/{content_hash[:2]}/{content_hash}.{name}.{DERIVATIVE_FORMAT.lower()}"
+
+
+def get_derivative_path(content_hash, name):
+    return Path(settings.MEDIA_ROOT) / get_derivative_name(content_hash, name)
+
+
+def get_derivative_url(content_hash, name):
+    return f"{settings.MEDIA_URL}{get_derivative_name(content_hash, name)}"
+
+
+def get_hash_path(name):
+    return Path(settings.MEDIA_ROOT) / DERIVATIVE_DIR / HASH_DIR / f"{name}.sha256"
+
+
+# stored name -> content hash, stored names never change content
+content_hashes = LRUCache(maxsize=4096)
+
+
+def record_content_hash(name, content_hash):
+    """Remember that the upload stored as `name` hashes to `content_hash`."""
+    path = get_hash_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, delete=False) as temporary:
+        temporary.write(content_hash)
+    os.replace(temporary.name, path)
+    content_hashes.set(name, content_hash)
+
+
+def get_recorded_hash(name):
+    """The content hash recorded for the stored upload `name`, or None."""
+    content_hash = content_hashes.get(name)
+    if content_hash is None:
+        try:
+            content_hash = get_hash_path(name).read_text().strip()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        content_hashes.set(name, content_hash)
+    return content_hash
+
+
+def get_derivative_url_for(field_file, name):
+    """URL of the `name` derivative of an image field's file, None when
+    there is no file or its hash was never recorded. The upload itself
+    is never read."""
+    if not field_file:
+        return None
+    content_hash = getattr(field_file, "content_hash", None) or get_recorded_hash(field_file.name)
+    if not content_hash:
+        return None
+    return get_derivative_url(content_hash, name)
+
+
+def get_missing_sizes(content_hash, sizes=None):
+    sizes = core_setting("IMAGE_DERIVATIVES") if sizes is None else sizes
+    return {
+        name: tuple(size)
+        for name, size in sizes.items()
+        if not get_derivative_path(content_hash, name).exists()
+    }
+
+
+def make_derivatives(source, content_hash, sizes=None):
+    """Write the derivatives of the image `source` (a path or an open
+    file) that don't exist yet, return their paths."""
+    missing = get_missing_sizes(content_hash, sizes)
+    if not missing:
+        return []
+
+    # largest first, each one is shrunk from the previous
+    ordered = sorted(missing.items(), key=lambda item: -(item[1][0] * item[1][1]))
+    written = []
+    with Image.open(source) as image:
+        # JPEGs are decoded at 1/2 to 1/8 of their size when that is enough
+        image.draft(None, ordered[0][1])
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        for name, size in ordered:
+            image.thumbnail(size, reducing_gap=3.0)
+            path = get_derivative_path(content_hash, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # written aside and renamed, a request never reads half a file
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as temporary:
+                image.save(temporary, DERIVATIVE_FORMAT, quality=DERIVATIVE_QUALITY)
+            os.replace(temporary.name, path)
+            written.append(path)
+    return written
+
+
+class DerivativeWorkers:
+    """Makes derivatives in at most IMAGE_WORKERS threads, with at most
+    IMAGE_QUEUE_SIZE images waiting. Images over that are skipped rather
+    than piling up in memory, their derivatives are made on the next
+    upload of the same content."""
+
+    def __init__(self):
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=core_setting("IMAGE_WORKERS"), thread_name_prefix="derivatives"
+            )
+        return self._executor
+
+    def submit(self, storage, name, content_hash, sizes=None):
+        """Queue the derivatives of `name` in `storage`, False when there
+        is nothing to do or the queue is full."""
+        if not get_missing_sizes(content_hash, sizes):
+            return False
+        with self._lock:
+            if content_hash in self._pending:
+                return False
+            if len(self._pending) >= core_setting("IMAGE_QUEUE_SIZE"):
+                logger.warning("Derivative queue full, skipping %s", name)
+                return False
+            self._pending.add(content_hash)
+        self.executor.submit(self.run, storage, name, content_hash, sizes)
+        return True
+
+    def run(self, storage, name, content_hash, sizes):
+        try:
+            with storage.open(name, "rb") as source:
+                make_derivatives(source, content_hash, sizes)
+        except Exception:
+            logger.exception("Could not make the derivatives of %s", name)
+        finally:
+            with self._lock:
+                self._pending.discard(content_hash)
+
+
+derivative_workers = DerivativeWorkers()
+
+
+def schedule_derivatives(storage, name, content_hash, sizes=None):
+    record_content_hash(name, content_hash)
+    return derivative_workers.submit(storage, name, content_hash, sizes)
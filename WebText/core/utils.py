@@ -1,28 +1,71 @@
-import random
+import functools
+import secrets
 import string
+from itertools import islice
 from dateutil.relativedelta import relativedelta
 from django.utils.dateparse import parse_date
 
 
 class PasswordGenerator:
+    """Random passwords from letters, plus digits and symbols when the
+    flags ask for them. Backslash and space are never used."""
+
+    SYMBOLS = string.punctuation.replace("\\", "")
 
     @classmethod
-    def generate(
+    @functools.lru_cache(maxsize=None)
+    def get_alphabet(cls, symbols_include=True, numbers_include=True):
+        alphabet = string.ascii_letters
+        if numbers_include:
+            alphabet = string.digits + alphabet
+        if symbols_include:
+            alphabet += cls.SYMBOLS
+        return alphabet
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def get_table(cls, symbols_include=True, numbers_include=True):
+        """Return `(table, rejected)` for bytes.translate: byte values
+        below the largest multiple of the alphabet size map onto the
+        alphabet, the rest are rejected so every character is equally
+        likely."""
+        alphabet = cls.get_alphabet(symbols_include, numbers_include).encode()
+        limit = 256 - 256 % len(alphabet)
+        table = bytes(alphabet[value % len(alphabet)] for value in range(256))
+        return table, bytes(range(limit, 256))
+
+    @classmethod
+    def generate_many(
         cls,
+        count,
         length=12,
         symbols_include=True,
         numbers_include=True,
     ):
-        generated = ""
+        """Generate `count` passwords from a few large secrets.token_bytes
+        calls instead of one random call per character. A `length` of 0
+        or less gives empty strings."""
+        if length <= 0:
+            return [""] * count
+        table, rejected = cls.get_table(symbols_include, numbers_include)
+        acceptance = 1 - len(rejected) / 256
+        needed = count * length
+        chars = bytearray()
+        while len(chars) < needed:
+            missing = needed - len(chars)
+            raw = secrets.token_bytes(int(missing / acceptance) + 16)
+            chars += raw.translate(table, rejected)
+        text = chars[:needed].decode("ascii")
+        return [text[start : start + length] for start in range(0, needed, length)]
 
-        for n in range(length):
-            x = random.randint(0, 94)
-            generated += string.printable[x]
-        if " " in generated:
-            generated = generated.replace(" ", "0")
-        if "\\" in generated:
-            generated = generated.replace("\\", "0")
-        return generated
+    @classmethod
+    def generate(
+        cls,
+        length=12,
+        symbols_include=True,
+        numbers_include=True,
+    ):
+        return cls.generate_many(1, length, symbols_include, numbers_include)[0]
 
     @classmethod
     def random(
@@ -35,10 +78,25 @@ class PasswordGenerator:
 
 
 def get_months_between(start_date, end_date):
+    """Month ranges from `start_date` to `end_date`, keyed "YYYY-MM".
+    To count rows per month use core.buckets.bucket_aggregate, which
+    needs one query instead of one per month."""
     months = {}
-    current_date = parse_date(start_date)
-    while current_date <= parse_date(end_date):
-        next_month = current_date + relativedelta(months=1)
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    index = 0
+    current_date = start
+    while current_date <= end:
+        # step from `start`, so the 31st isn't clipped to the 28th for good
+        next_month = start + relativedelta(months=index + 1)
         months[current_date.strftime("%Y-%m")] = (current_date, next_month)
         current_date = next_month
+        index += 1
     return months
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
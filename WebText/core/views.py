@@ -3,28 +3,39 @@ This file is used to define the views for the game
 
 This File Does:
 
-1. Defines the BaseFormView class
-2. Defines the BaseDeleteFormView class
-3. Defines the BaseDetailView class
-4. Defines the BaseListView class
+1. Defines the CachedObjectMixin class
+2. Defines the BaseFormView class
+3. Defines the BaseDeleteFormView class
+4. Defines the BaseDetailView class
+5. Defines the BaseListView class
+6. Queues the derivatives of the images uploaded through BaseFormView
 
 """
 
 import json
+from functools import partial
 from typing import Any
 
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth.models import User
 from django.contrib.messages.views import SuccessMessageMixin
+from django.core.cache import caches
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models, transaction
 from django.forms import Form
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.views.generic.edit import CreateView, UpdateView
 from django.views.generic import FormView, ListView, UpdateView, DetailView, DeleteView
+from rest_framework.exceptions import NotFound
 
+from core.conf import core_setting
 from core.mixins import UserRequiredMixin
+from core.pagination import EstimatedCountPaginator, KeysetPagination
+from core.uploads import get_content_hash, schedule_derivatives
 
 
 class BasePermissionMixin(UserRequiredMixin, UserPassesTestMixin):
@@ -40,21 +51,39 @@ class BasePermissionMixin(UserRequiredMixin, UserPassesTestMixin):
         return self.request.user.is_superuser  # type: ignore
 
 
-class BaseFormView(FormView, BasePermissionMixin):
+class CachedObjectMixin:
+    """Loads the object of the `pk` kwarg once per request, so get_initial,
+    get_form and form_valid all reuse the same instance. get_object()
+    returns None when there is no `pk`."""
+
+    def get_object(self):
+        if not hasattr(self, "_object"):
+            id = self.kwargs.get("pk", None)
+            self._object = None
+            if id:
+                self._object = get_object_or_404(self.form_class.get_model, pk=id)
+        return self._object
+
+
+class BaseFormView(CachedObjectMixin, FormView, BasePermissionMixin):
     form_class: Form = Form
     success_url: str = ""
     template_name: str = ""
+    # recorded by core.middlewares.InstrumentationMiddleware
+    instrumented = True
 
     def get(self, request, *args, **kwargs):
         if not self.test_func():
             return redirect_to_login(next=request.path)
         return super().get(request, *args, **kwargs)
 
-    def get_object(self):
-        id = self.kwargs.get("pk", None)
-        if id:
-            return get_object_or_404(self.form_class.get_model, pk=id)
-        return None
+    def get_update_fields(self, obj, fields):
+        """The columns to save for `fields`, plus updated_at."""
+        concrete = {field.name for field in obj._meta.concrete_fields}
+        update_fields = [field for field in fields if field in concrete]
+        if update_fields and "updated_at" in concrete:
+            update_fields.append("updated_at")
+        return update_fields
 
     def get_initial(self) -> dict[str, Any]:
         initial = super().get_initial()
@@ -75,28 +104,41 @@ class BaseFormView(FormView, BasePermissionMixin):
         if form.instance != None:
             obj = self.get_object()
             if obj:
-                for field in self.form_fields():
+                fields = form.form_fields()
+                for field in fields:
                     setattr(obj, field, form_data.get(field, getattr(obj, field)))
-                obj.save()
+                update_fields = self.get_update_fields(obj, fields)
+                if update_fields:
+                    obj.save(update_fields=update_fields)
             else:
                 raise ValueError("Object not found")
         else:
             obj = self.form_class.get_model(**form_data)
             obj.save()
+        self.schedule_derivatives(obj, form_data)
         return super().form_valid(form)
 
-
-class BaseDeleteFormView(DeleteView, BasePermissionMixin):
-
-    def get_object(self):
-        id = self.kwargs.get("pk", None)
-        if id:
-            return get_object_or_404(self.form_class.get_model, pk=id)
-        return None
-
-    def form_valid(self, form):
-        self.get_object().delete()
-        return super().form_valid(form)
+    def schedule_derivatives(self, obj, form_data):
+        """Queue the derivatives of the images uploaded with the form,
+        they are made in the background once `obj` is committed."""
+        for field in obj._meta.concrete_fields:
+            upload = form_data.get(field.name)
+            if not isinstance(field, models.ImageField) or not isinstance(upload, UploadedFile):
+                continue
+            field_file = getattr(obj, field.name)
+            # kept on the file for this request, recorded for the next ones
+            field_file.content_hash = get_content_hash(upload)
+            transaction.on_commit(
+                partial(
+                    schedule_derivatives,
+                    field_file.storage,
+                    field_file.name,
+                    field_file.content_hash,
+                )
+            )
+
+
+class BaseDeleteFormView(CachedObjectMixin, DeleteView, BasePermissionMixin):
 
     def get(self, request, *args, **kwargs):
         if not self.test_func():
@@ -112,6 +154,19 @@ class BaseDetailView(DetailView, BasePermissionMixin):
 
 
 class BaseListView(ListView, BasePermissionMixin):
+    # recorded by core.middlewares.InstrumentationMiddleware
+    instrumented = True
+    # big unfiltered tables show an estimated count instead of COUNT(*)
+    paginator_class = EstimatedCountPaginator
+    # follow `?cursor=` links over (created_at, id) instead of page numbers
+    keyset_pagination = False
+    keyset_pagination_class = KeysetPagination
+    # template rendered once per row and cached by pk + updated_at, it only
+    # gets `object` in its context so it must not depend on the user
+    row_template_name = None
+    row_cache_alias = "default"
+    row_cache_timeout = None
+
     def get(self, request, *args, **kwargs):
         if not self.test_func():
             return redirect_to_login(next=request.path)
@@ -119,6 +174,62 @@ class BaseListView(ListView, BasePermissionMixin):
 
     paginate_by = 10
 
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_pagination:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = self.keyset_pagination_class()
+        paginator.page_size = page_size
+        paginator.page_size_query_param = None
+        try:
+            object_list = paginator.paginate_queryset(queryset, self.request, view=self)
+        except (NotFound, ValueError):
+            # DRF's NotFound means nothing to a plain Django view
+            raise Http404(paginator.invalid_cursor_message)
+        is_paginated = bool(paginator.next_position or paginator.previous_position)
+        return (paginator, None, object_list, is_paginated)
+
+    def get_row_cache_key(self, obj):
+        updated_at = getattr(obj, "updated_at", None)
+        if updated_at is None:
+            return None
+        return "core.row:%s:%s:%s:%s" % (
+            self.row_template_name,
+            obj._meta.label_lower,
+            obj.pk,
+            updated_at.timestamp(),
+        )
+
+    def get_rendered_rows(self, object_list):
+        """Render `row_template_name` for every object, reusing the
+        fragments of rows that haven't changed since they were cached."""
+        cache = caches[self.row_cache_alias]
+        keys = [self.get_row_cache_key(obj) for obj in object_list]
+        cached = cache.get_many([key for key in keys if key is not None])
+        rows, missing = [], {}
+        for obj, key in zip(object_list, keys):
+            html = cached.get(key)
+            if html is None:
+                html = render_to_string(self.row_template_name, {"object": obj})
+                if key is not None:
+                    missing[key] = html
+            rows.append(html)
+        if missing:
+            timeout = self.row_cache_timeout
+            if timeout is None:
+                timeout = core_setting("ROW_CACHE_TTL")
+            cache.set_many(missing, timeout)
+        return rows
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        paginator = context.get("paginator")
+        if self.keyset_pagination and paginator is not None:
+            context["next_url"] = paginator.get_next_link()
+            context["previous_url"] = paginator.get_previous_link()
+        if self.row_template_name:
+            context["rendered_rows"] = self.get_rendered_rows(context["object_list"])
+        return context
+
 
 class UserCreateView(UserRequiredMixin, SuccessMessageMixin, CreateView):
     """Mixin for creating a user."""